@@ -7,15 +7,28 @@ Team: Bhavishya Sharma,  Aarjav Jain, Aaditya Garg
 School: Bharatiya Vidya Bhavan Vidyashram
 """
 
-import cv2
-from cvzone.HandTrackingModule import HandDetector
-from gtts import gTTS
-import pygame
 import time
+# Measured from here so the time to first frame includes loading OpenCV and NumPy
+STARTUP_STARTED = time.perf_counter()
+
+import cv2
 import numpy as np
 import os
 import sys
+import math
+import json
 import itertools
+import threading
+import io
+import queue
+import hashlib
+import tempfile
+import argparse
+import contextlib
+import abc
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from collections import OrderedDict, namedtuple
 
 # ==========================
 # CONFIGURATION CONSTANTS
@@ -25,12 +38,85 @@ class Config:
     CAMERA_INDEX = 3
     CAMERA_WIDTH = 1920
     CAMERA_HEIGHT = 1080
+    CAMERA_PROBE_INDICES = 5
+    CAMERA_PROBE_TIMEOUT = 3.0
+    CAMERA_CACHE_PATH = ".havi_camera.json"
+    STARTUP_LOG_PATH = None
+    
+    CAPTURE_THREADED = True
+    CAPTURE_BUFFERS = 3
+    CAPTURE_TIMEOUT = 2.0
+    CAPTURE_NEGOTIATE = True
+    CAPTURE_TARGET_FPS = 30
+    CAPTURE_MODES = ((1920, 1080), (1280, 720), (960, 540), (640, 480))
+    CAPTURE_FOURCCS = ("MJPG", "YUYV")
+    CAPTURE_MEASURE_FRAMES = 10
+    
+    ADAPTIVE_RESOLUTION = True
+    RESOLUTION_FPS_BAND = (0.75, 0.92)
+    RESOLUTION_SETTLE_SECONDS = 2.0
+    RESOLUTION_INFERENCE_SCALES = (0.75, 0.5, 0.35, 0.25)
+    # Smallest capture size the overlay layout fits in
+    RESOLUTION_MIN_CAPTURE = (960, 540)
     
     FIRST_LETTER_DELAY = 2.5
     LETTER_DETECTION_DELAY = 1.5
+    RECOGNIZER_WINDOW = 16
+    RECOGNIZER_WINDOW_SECONDS = 0.5
+    RECOGNIZER_CONFIDENCE = 0.7
     
     DETECTION_CONFIDENCE = 0.8
     MAX_HANDS = 2
+    INFERENCE_SCALE = 0.5
+    
+    VOCABULARY_PATH = "havi_vocabulary.json"
+    VOCABULARY_POLL_INTERVAL = 1.0
+    
+    LANDMARK_INDEX_PATH = "havi_landmarks.npz"
+    LANDMARK_K = 5
+    LANDMARK_MAX_DISTANCE = 0.25
+    
+    DETECTION_ADAPTIVE = True
+    DETECTION_BUDGET_MS = 12.0
+    DETECTION_MAX_STRIDE = 4
+    DETECTION_MIN_RATE = 8
+    
+    # Largest allocation (bytes) a steady-state frame may make in alloc-check
+    ALLOC_CHECK_THRESHOLD = 64 * 1024
+    
+    IDLE_ENABLED = True
+    IDLE_TIMEOUT = 10.0
+    IDLE_FPS = 5
+    IDLE_MOTION_WIDTH = 96
+    IDLE_MOTION_THRESHOLD = 0.005
+    IDLE_PIXEL_DELTA = 25
+    
+    LEXICON_PATH = "havi_lexicon.txt"
+    LEXICON_TRIE_PATH = ".havi_lexicon.trie"
+    COMPLETION_COUNT = 3
+    COMPLETION_MIN_PREFIX = 1
+    
+    EVENT_SINKS = ()
+    EVENT_POLICY = "drop_oldest"
+    EVENT_QUEUE_SIZE = 1024
+    EVENT_BATCH_SIZE = 64
+    EVENT_FLUSH_INTERVAL = 0.05
+    EVENT_BLOCK_TIMEOUT = 0.002
+    
+    TTS_BACKEND = "offline"
+    TTS_LANGUAGE = "en"
+    TTS_VOICE = None
+    TTS_CACHE_DIR = ".havi_tts_cache"
+    TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    TTS_MEMORY_CACHE_BYTES = 16 * 1024 * 1024
+    
+    SPEECH_STREAMING = False
+    SPEECH_STREAM_BACKLOG = 4
+    SPEECH_STREAM_MAX_LATENCY = 5.0
+    
+    SESSION_FPS = 15
+    SESSION_RESTART_DELAY = 1.0
+    SESSION_MAX_RESTART_DELAY = 30.0
     
     # Modern UI Colors
     COLOR_BG_DARK = (20, 20, 30)
@@ -44,6 +130,11 @@ class Config:
     COLOR_PROGRESS = (100, 150, 255)
     COLOR_PROGRESS_BG = (60, 60, 80)
     
+    PROFILE_ENABLED = False
+    PROFILE_WINDOW = 240
+    PROFILE_EXPORT_PATH = None
+    PROFILE_EXPORT_INTERVAL = 5.0
+    
     SCROLL_SPEED = 6
     SCROLL_LINE_HEIGHT = 60
     SCROLL_FPS = 30
@@ -73,17 +164,199 @@ HAND_PATTERNS = {
     "00100 00100": "THANK YOU"
 }
 
+# Gestures that trigger an action instead of adding text
+ACCEPT_COMPLETION = "[ACCEPT]"
+COMMAND_PATTERNS = {
+    "11111": ACCEPT_COMPLETION,
+}
+
+# ==========================
+# GESTURE VOCABULARY
+# ==========================
+
+NO_PATTERN = "-----"
+PATTERN_STRINGS = tuple(format(code, "05b") for code in range(32))
+PAIR_PATTERN_STRINGS = tuple(f"{PATTERN_STRINGS[code >> 5]} {PATTERN_STRINGS[code & 31]}"
+                             for code in range(1024))
+
+def encode_fingers(fingers):
+    """Encode a fingersUp list as a 5-bit integer, thumb first (most significant)"""
+    code = 0
+    for finger in fingers:
+        code = (code << 1) | (1 if finger else 0)
+    return code
+
+class GestureVocabulary:
+    """Finger patterns compiled into flat integer-indexed lookup tables.
+
+    One hand is a 5-bit code and two hands are left << 5 | right, so a lookup
+    is a single array index. Tokens are stored once and referenced by index.
+    """
+    
+    WEIGHTS = np.array([16, 8, 4, 2, 1], np.int32)
+    
+    def __init__(self, patterns, max_hands=Config.MAX_HANDS, name="built-in"):
+        self.name = name
+        self.patterns = dict(patterns)
+        self.tokens = []
+        self.warnings = []
+        self.single = np.full(32, -1, np.int32)
+        self.double = np.full(1024, -1, np.int32)
+        
+        errors = []
+        token_index = {}
+        seen = {}
+        for pattern, token in self.patterns.items():
+            try:
+                hands, code = self.parse_pattern(pattern)
+            except ValueError as e:
+                errors.append(str(e))
+                continue
+            if (hands, code) in seen:
+                errors.append(f"Pattern '{pattern}' collides with '{seen[(hands, code)]}'")
+                continue
+            seen[(hands, code)] = pattern
+            if not token or not str(token).strip():
+                self.warnings.append(f"Pattern '{pattern}' has an empty token and is unreachable")
+                continue
+            if hands > max_hands:
+                self.warnings.append(f"Pattern '{pattern}' needs {hands} hands but only {max_hands} "
+                                     f"are tracked; it is unreachable")
+            if token not in token_index:
+                token_index[token] = len(self.tokens)
+                self.tokens.append(token)
+            table = self.single if hands == 1 else self.double
+            table[code] = token_index[token]
+        
+        if errors:
+            raise ValueError(f"Invalid gesture vocabulary '{name}': " + "; ".join(errors))
+        
+        # Index -1 (no match) lands on the trailing None
+        self._token_array = np.array(self.tokens + [None], dtype=object)
+    
+    @staticmethod
+    def parse_pattern(pattern):
+        """Return (hand_count, code) for a pattern string like '01001' or '00000 11111'"""
+        parts = str(pattern).split()
+        if len(parts) not in (1, 2) or any(len(p) != 5 or set(p) - {"0", "1"} for p in parts):
+            raise ValueError(f"Malformed pattern '{pattern}'")
+        codes = [int(p, 2) for p in parts]
+        if len(codes) == 1:
+            return 1, codes[0]
+        return 2, (codes[0] << 5) | codes[1]
+    
+    @classmethod
+    def from_file(cls, path, max_hands=Config.MAX_HANDS):
+        """Load a JSON vocabulary mapping pattern strings to tokens"""
+        duplicates = []
+        
+        def collect(pairs):
+            result = {}
+            for key, value in pairs:
+                if key in result:
+                    duplicates.append(key)
+                result[key] = value
+            return result
+        
+        with open(path, "r", encoding="utf-8") as f:
+            patterns = json.load(f, object_pairs_hook=collect)
+        if duplicates:
+            raise ValueError(f"Invalid gesture vocabulary '{path}': duplicate patterns "
+                             + ", ".join(sorted(set(duplicates))))
+        return cls(patterns, max_hands=max_hands, name=path)
+    
+    def lookup(self, hand_count, code):
+        """Return the token for an encoded pattern, or None"""
+        if hand_count == 1:
+            index = self.single[code]
+        elif hand_count == 2:
+            index = self.double[code]
+        else:
+            return None
+        return self.tokens[index] if index >= 0 else None
+    
+    def classify(self, hands_data):
+        """Return (display_pattern, token) for the hands of one frame"""
+        if len(hands_data) == 1:
+            code = encode_fingers(hands_data[0]['fingers'])
+            index = self.single[code]
+            pattern = PATTERN_STRINGS[code]
+        elif len(hands_data) == 2:
+            left, right = hands_data
+            if left['center'][0] > right['center'][0]:
+                left, right = right, left
+            code = (encode_fingers(left['fingers']) << 5) | encode_fingers(right['fingers'])
+            index = self.double[code]
+            pattern = PAIR_PATTERN_STRINGS[code]
+        else:
+            return NO_PATTERN, None
+        return pattern, (self.tokens[index] if index >= 0 else None)
+    
+    def classify_batch(self, fingers):
+        """Classify an (N, 5) array of one-hand or (N, 10) array of left+right finger states.
+
+        Returns an object array of tokens with None where nothing matches.
+        """
+        fingers = np.asarray(fingers, np.int32)
+        if fingers.ndim != 2 or fingers.shape[1] not in (5, 10):
+            raise ValueError("Expected finger states shaped (N, 5) or (N, 10)")
+        if fingers.shape[1] == 5:
+            indices = self.single[fingers @ self.WEIGHTS]
+        else:
+            codes = (fingers[:, :5] @ self.WEIGHTS << 5) | (fingers[:, 5:] @ self.WEIGHTS)
+            indices = self.double[codes]
+        return self._token_array[indices]
+
+class VocabularyWatcher:
+    """Serve a vocabulary file and swap in a new version when the file changes"""
+    
+    def __init__(self, path=Config.VOCABULARY_PATH, fallback=None, poll_interval=Config.VOCABULARY_POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.vocabulary = fallback if fallback is not None else DEFAULT_VOCABULARY
+        self._mtime = None
+        self._next_poll = 0.0
+        self.poll(force=True)
+    
+    def poll(self, now=None, force=False):
+        """Return the current vocabulary, reloading the file if it changed"""
+        if not self.path:
+            return self.vocabulary
+        now = time.monotonic() if now is None else now
+        if not force and now < self._next_poll:
+            return self.vocabulary
+        self._next_poll = now + self.poll_interval
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return self.vocabulary
+        if mtime != self._mtime:
+            self._mtime = mtime
+            try:
+                vocabulary = GestureVocabulary.from_file(self.path)
+            except (OSError, ValueError) as e:
+                print(f"[ERROR] Keeping current vocabulary: {e}")
+                return self.vocabulary
+            for warning in vocabulary.warnings:
+                print(f"[WARNING] {warning}")
+            self.vocabulary = vocabulary
+            print(f"[INFO] Loaded vocabulary '{self.path}' with {len(vocabulary.tokens)} tokens")
+        return self.vocabulary
+
+DEFAULT_VOCABULARY = GestureVocabulary({**HAND_PATTERNS, **COMMAND_PATTERNS})
+
 # ==========================
 # HELPER FUNCTIONS
 # ==========================
 
-def loading_animation(text="Initializing system", duration=3):
-    """Display a loading animation in the console"""
+def loading_animation(text="Initializing system", duration=3, wait=None):
+    """Display a loading animation in the console, for duration seconds or until the wait futures finish"""
     spinner = itertools.cycle(['|', '/', '-', '\\'])
     start_time = time.time()
     sys.stdout.write(text + " ")
     sys.stdout.flush()
-    while time.time() - start_time < duration:
+    while (not all(future.done() for future in wait) if wait is not None
+           else time.time() - start_time < duration):
         sys.stdout.write(next(spinner))
         sys.stdout.flush()
         time.sleep(0.1)
@@ -100,47 +373,168 @@ def play_intro():
         "  Priyanshi Mathur",
         "  Aarjav Jain"
     ]
-pygame.mixer.init()
-pygame.mixer.music.load("havi_intro.mp3")
-pygame.mixer.music.play()
-
-def initialize_camera(index=Config.CAMERA_INDEX):
-    """Initialize camera with error handling"""
     try:
-        cap = cv2.VideoCapture(index)
-        if not cap.isOpened():
-            print(f"[ERROR] Cannot open camera at index {index}")
-            print("[INFO] Trying alternative camera indices...")
-            for alt_index in range(5):
-                cap = cv2.VideoCapture(alt_index)
-                if cap.isOpened():
-                    print(f"[SUCCESS] Camera opened at index {alt_index}")
-                    break
-            else:
-                raise ValueError("No working camera found")
-        
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, Config.CAMERA_WIDTH)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, Config.CAMERA_HEIGHT)
-        return cap
+        mixer = ensure_mixer()
+        mixer.music.load("havi_intro.mp3")
+        mixer.music.play()
     except Exception as e:
-        print(f"[ERROR] Camera initialization failed: {e}")
-        raise
+        print(f"[WARNING] Cannot play intro audio: {e}")
 
-def get_letter_from_pattern(hands_data):
-    """Extract letter from hand gesture pattern"""
-    if len(hands_data) == 1:
-        pattern = ''.join(map(str, hands_data[0]['fingers']))
-        return HAND_PATTERNS.get(pattern, None)
-    elif len(hands_data) == 2:
-        hands_sorted = sorted(hands_data, key=lambda h: h['center'][0])
-        left_pattern = ''.join(map(str, hands_sorted[0]['fingers']))
-        right_pattern = ''.join(map(str, hands_sorted[1]['fingers']))
-        combined_pattern = f"{left_pattern} {right_pattern}"
-        return HAND_PATTERNS.get(combined_pattern, None)
+def load_camera_cache(path=None):
+    """Return the last camera that worked as a dict (index, width, height, fourcc, fps), or None"""
+    path = path or Config.CAMERA_CACHE_PATH
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        return cached if isinstance(cached.get("index"), int) else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def save_camera_cache(index, cap, negotiated=None, path=None):
+    path = path or Config.CAMERA_CACHE_PATH
+    mode = {"index": index,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}
+    if negotiated is not None:
+        mode.update(fourcc=negotiated.fourcc, fps=round(negotiated.fps, 1))
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(mode, f)
+    except OSError as e:
+        print(f"[WARNING] Cannot save camera cache: {e}")
+
+def camera_delivered_fps(cap):
+    """Frame rate the camera really delivers, from its negotiated mode if measured, else as reported"""
+    reported = cap.get(cv2.CAP_PROP_FPS) or Config.CAPTURE_TARGET_FPS
+    cached = load_camera_cache()
+    if cached is not None and cached.get("fps") and (cached.get("width"), cached.get("height")) == (
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))):
+        return min(reported, cached["fps"])
+    return reported
+
+def probe_camera(index, width, height, fourcc=None):
+    """Open a camera, set its mode and check that it delivers a frame; returns the capture or None"""
+    cap = cv2.VideoCapture(index)
+    if cap.isOpened():
+        apply_capture_mode(cap, width, height, fourcc)
+        if cap.read()[0]:
+            return cap
+    cap.release()
     return None
 
-def speak_detected_letters(detected_letters):
-    """Speak all detected letters/words using gTTS"""
+def _probe_cameras(candidates, modes):
+    """Probe candidates in parallel and return (index, cap) for the first in order to deliver a frame in time.
+
+    Probes run on daemon threads, so one stuck in a hung driver is abandoned
+    for real and cannot keep the process from exiting. A probe that finishes
+    after the choice was made releases its device itself.
+    """
+    results = queue.Queue()
+    lock = threading.Lock()
+    closed = []
+    
+    def probe(candidate):
+        try:
+            outcome = probe_camera(candidate,
+                                   *modes.get(candidate, (Config.CAMERA_WIDTH, Config.CAMERA_HEIGHT, None)))
+        except Exception as e:
+            outcome = e
+        with lock:
+            if not closed:
+                results.put((candidate, outcome))
+                return
+        if outcome is not None and not isinstance(outcome, Exception):
+            outcome.release()
+    
+    for candidate in candidates:
+        threading.Thread(target=probe, args=(candidate,), name=f"havi-camera-probe-{candidate}",
+                         daemon=True).start()
+    
+    def works(outcome):
+        return outcome is not None and not isinstance(outcome, Exception)
+    
+    reported = {}
+    deadline = time.monotonic() + Config.CAMERA_PROBE_TIMEOUT
+    while True:
+        # Decided once every earlier candidate has failed and this one works
+        pending = [candidate for candidate in candidates
+                   if candidate not in reported or works(reported[candidate])]
+        if not pending or (pending[0] in reported):
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            candidate, outcome = results.get(timeout=remaining)
+        except queue.Empty:
+            break
+        reported[candidate] = outcome
+    with lock:
+        closed.append(True)
+    while not results.empty():
+        candidate, outcome = results.get_nowait()
+        reported[candidate] = outcome
+    
+    chosen = next((candidate for candidate in candidates if works(reported.get(candidate))), None)
+    for candidate in candidates:
+        if candidate == chosen:
+            break
+        if candidate not in reported:
+            print(f"[WARNING] Camera {candidate} did not respond within {Config.CAMERA_PROBE_TIMEOUT:.1f}s")
+        elif isinstance(reported[candidate], Exception):
+            print(f"[WARNING] Camera {candidate} failed: {reported[candidate]}")
+    for candidate, outcome in reported.items():
+        if candidate != chosen and works(outcome):
+            outcome.release()
+    return chosen, reported.get(chosen)
+
+def initialize_camera(index=Config.CAMERA_INDEX):
+    """Initialize camera with error handling.
+
+    The cached last-working camera (or else the requested index) is probed on
+    its own first, so other cameras on the machine are left alone while it
+    works. Only if it fails or times out are the remaining indices probed in
+    parallel; the first of them in order to deliver a frame within the timeout
+    is used. Its capture mode is then negotiated, unless the cache already
+    holds the mode negotiated for it.
+    """
+    cached = load_camera_cache()
+    candidates = [index] + [i for i in range(Config.CAMERA_PROBE_INDICES) if i != index]
+    modes = {}
+    if cached is not None:
+        if cached["index"] in candidates:
+            candidates.remove(cached["index"])
+        candidates.insert(0, cached["index"])
+        modes[cached["index"]] = (cached.get("width", Config.CAMERA_WIDTH),
+                                  cached.get("height", Config.CAMERA_HEIGHT), cached.get("fourcc"))
+    
+    candidate, cap = _probe_cameras(candidates[:1], modes)
+    if cap is None and len(candidates) > 1:
+        candidate, cap = _probe_cameras(candidates[1:], modes)
+    if cap is None:
+        print("[ERROR] Camera initialization failed: No working camera found")
+        raise ValueError("No working camera found")
+    
+    if candidate != index:
+        print(f"[SUCCESS] Camera opened at index {candidate} (configured index {index})")
+    negotiated = None
+    if Config.CAPTURE_NEGOTIATE and modes.get(candidate, (None,) * 3)[2] is None:
+        negotiated, results = negotiate_capture_mode(cap)
+        for mode in results:
+            print(f"[INFO] Camera {candidate}: {mode.width}x{mode.height} {mode.fourcc or '?'} "
+                  f"delivers {mode.fps:.1f} fps")
+        print(f"[SUCCESS] Capture mode {negotiated.width}x{negotiated.height} "
+              f"{negotiated.fourcc or '?'} at {negotiated.fps:.1f} fps")
+    if negotiated is not None or candidate not in modes:
+        save_camera_cache(candidate, cap, negotiated)
+    return cap
+
+def get_letter_from_pattern(hands_data, vocabulary=DEFAULT_VOCABULARY):
+    """Extract letter from hand gesture pattern"""
+    return vocabulary.classify(hands_data)[1]
+
+def speak_detected_letters(detected_letters, worker=None):
+    """Speak all detected letters/words, in the background when a SpeechWorker is given"""
     if not detected_letters:
         print("[INFO] No letters to speak.")
         return
@@ -148,25 +542,15 @@ def speak_detected_letters(detected_letters):
     text_to_speak = " ".join(detected_letters)
     print(f"[SPEAKING] {text_to_speak}")
     
+    if worker is not None:
+        worker.say(text_to_speak)
+        return
+    
     try:
-        tts = gTTS(text=text_to_speak, lang='en')
-        tts.save("speak_output.mp3")
-        
-        pygame.mixer.init()
-        pygame.mixer.music.load("speak_output.mp3")
-        pygame.mixer.music.play()
-        
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        
-        pygame.mixer.quit()
-        
-        if os.path.exists("speak_output.mp3"):
-            os.remove("speak_output.mp3")
-        
-        print("[SUCCESS] Speech output via gTTS")
+        get_speech_engine().speak(text_to_speak)
+        print("[SUCCESS] Speech output")
     except Exception as e:
-        print(f"[ERROR] Failed to speak (gTTS requires internet): {e}")
+        print(f"[ERROR] Failed to speak: {e}")
 
 def draw_rounded_rect(img, pt1, pt2, color, thickness=-1, radius=15):
     """Draw a rounded rectangle"""
@@ -202,107 +586,236 @@ def put_bold_text(img, text, org, font, font_scale, color, thickness=1, offset=1
             cv2.putText(img, text, (x + dx, y + dy), font, font_scale, color, thickness)
     cv2.putText(img, text, org, font, font_scale, color, thickness + 1)
 
-def draw_ui_overlay(frame, current_pattern, detected_letter, detected_sentence, is_first_detection, first_detection_progress):
-    """Draw modern UI overlay on the frame"""
-    h, w, _ = frame.shape
-    
-    overlay = frame.copy()
-    
-    # Top Header Bar
-    draw_rounded_rect(overlay, (20, 20), (w - 20, 100), Config.COLOR_BG_CARD, -1, 20)
-    cv2.putText(overlay, "HAVI", (40, 70),
-                cv2.FONT_HERSHEY_DUPLEX, 1.5, Config.COLOR_PRIMARY, 3)
-    cv2.putText(overlay, "Hand AI Voice Interface", (250, 70),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.8, Config.COLOR_TEXT_DIM, 2)
-    
-    # Left Card - Pattern Display
-    draw_rounded_rect(overlay, (20, 120), (420, 240), Config.COLOR_BG_CARD, -1, 15)
-    cv2.putText(overlay, "PATTERN", (40, 155),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, Config.COLOR_TEXT_DIM, 2)
-    cv2.putText(overlay, current_pattern, (40, 210),
-                cv2.FONT_HERSHEY_DUPLEX, 1.2, Config.COLOR_PRIMARY, 3)
-    
-    # Right Card - Detection Status
-    detection_color = Config.COLOR_SUCCESS if detected_letter else Config.COLOR_BG_LIGHT
-    draw_rounded_rect(overlay, (440, 120), (w - 20, 240), detection_color, -1, 15)
-    cv2.putText(overlay, "DETECTED", (460, 155),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, Config.COLOR_TEXT_DIM, 2)
-    
-    detected_text = detected_letter if detected_letter else "None"
-    text_color = Config.COLOR_TEXT if detected_letter else Config.COLOR_TEXT_DIM
-    cv2.putText(overlay, detected_text, (460, 210),
-                cv2.FONT_HERSHEY_DUPLEX, 1.2, text_color, 3)
-    
-    # Progress Bar Section (only show during first detection)
-    if is_first_detection and first_detection_progress > 0:
-        draw_rounded_rect(overlay, (20, 260), (w - 20, 360), Config.COLOR_BG_CARD, -1, 15)
-        
-        cv2.putText(overlay, "HOLD GESTURE TO DETECT", (40, 295),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, Config.COLOR_TEXT_DIM, 2)
-        
-        progress_bar_x = 40
-        progress_bar_y = 310
-        progress_bar_width = w - 80
-        progress_bar_height = 30
-        
-        draw_rounded_rect(overlay, 
-                         (progress_bar_x, progress_bar_y), 
-                         (progress_bar_x + progress_bar_width, progress_bar_y + progress_bar_height),
-                         Config.COLOR_PROGRESS_BG, -1, 10)
-        
-        filled_width = int(progress_bar_width * first_detection_progress)
-        if filled_width > 0:
-            draw_rounded_rect(overlay, 
-                             (progress_bar_x, progress_bar_y), 
-                             (progress_bar_x + filled_width, progress_bar_y + progress_bar_height),
-                             Config.COLOR_PROGRESS, -1, 10)
-        
-        percentage_text = f"{int(first_detection_progress * 100)}%"
-        text_size = cv2.getTextSize(percentage_text, cv2.FONT_HERSHEY_DUPLEX, 0.7, 2)[0]
-        text_x = progress_bar_x + (progress_bar_width - text_size[0]) // 2
-        text_y = progress_bar_y + (progress_bar_height + text_size[1]) // 2
-        cv2.putText(overlay, percentage_text, (text_x, text_y),
-                    cv2.FONT_HERSHEY_DUPLEX, 0.7, Config.COLOR_TEXT, 2)
-    
-    # Sentence Display Section
-    sentence_y = 380 if is_first_detection and first_detection_progress > 0 else 260
-    draw_rounded_rect(overlay, (20, sentence_y), (w - 20, sentence_y + 100), Config.COLOR_BG_CARD, -1, 15)
-    
-    cv2.putText(overlay, "SENTENCE", (40, sentence_y + 35),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, Config.COLOR_TEXT_DIM, 2)
-    
-    sentence_display = detected_sentence[-60:] if len(detected_sentence) > 60 else detected_sentence
-    if not sentence_display.strip():
-        sentence_display = "Start making gestures..."
-        sentence_color = Config.COLOR_TEXT_DIM
-    else:
-        sentence_color = Config.COLOR_TEXT
-    
-    cv2.putText(overlay, sentence_display, (40, sentence_y + 75),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.9, sentence_color, 2)
-    
-    # Bottom Control Bar
-    draw_rounded_rect(overlay, (0, h - 60), (w, h), Config.COLOR_BG_CARD, -1, 0)
-    
-    controls = [
-        ("SPACE", "Add Space"),
-        ("C", "Clear"),
-        ("S", "Speak"),
-        ("Q", "Quit")
-    ]
-    
-    x_offset = 40
-    for key, action in controls:
-        cv2.rectangle(overlay, (x_offset, h - 45), (x_offset + 80, h - 20), Config.COLOR_PRIMARY, -1)
-        put_bold_text(overlay, key, (x_offset + 10, h - 28),
-                      cv2.FONT_HERSHEY_DUPLEX, 0.5, Config.COLOR_TEXT, 1, 1)
-        put_bold_text(overlay, action, (x_offset + 95, h - 28),
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, Config.COLOR_TEXT_DIM, 1, 1)
-        x_offset += 280
-    
-    cv2.addWeighted(overlay, 0.95, frame, 0.05, 0, frame)
+# Progress labels for every whole percent, so the overlay does not format one per frame
+PERCENT_STRINGS = tuple(f"{percent}%" for percent in range(101))
+
+class OverlayRenderer:
+    """Draw the UI overlay from a cached static layer.
+
+    Header, card backgrounds, labels and the control bar are rasterized once per
+    resolution. Each frame only the dynamic text is drawn and only the rows
+    covered by UI elements are blended into the camera frame.
+    """
+
+    def __init__(self):
+        self._size = None
+        self._static = {}
+        self._work = None
+        self._mask = None
+        self._blend = None
+        self._text_sizes = {}
+
+    def _resize(self, w, h):
+        self._size = (w, h)
+        self._static = {}
+        self._work = np.zeros((h, w, 3), np.uint8)
+        self._mask = np.zeros((h, w), np.uint8)
+        self._blend = np.zeros((h, w, 3), np.uint8)
+
+    @staticmethod
+    def _hud_rect(w, h, lines):
+        top = h - 80 - (30 + lines * 24)
+        return (w - 480, top), (w - 20, h - 80)
     
-    return frame
+    @staticmethod
+    def _draw_under(img, w, h, detected, show_progress, hud_lines):
+        draw_rounded_rect(img, (20, 20), (w - 20, 100), Config.COLOR_BG_CARD, -1, 20)
+        cv2.putText(img, "HAVI", (40, 70),
+                    cv2.FONT_HERSHEY_DUPLEX, 1.5, Config.COLOR_PRIMARY, 3)
+        cv2.putText(img, "Hand AI Voice Interface", (250, 70),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, Config.COLOR_TEXT_DIM, 2)
+        
+        draw_rounded_rect(img, (20, 120), (420, 240), Config.COLOR_BG_CARD, -1, 15)
+        cv2.putText(img, "PATTERN", (40, 155),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, Config.COLOR_TEXT_DIM, 2)
+        
+        detection_color = Config.COLOR_SUCCESS if detected else Config.COLOR_BG_LIGHT
+        draw_rounded_rect(img, (440, 120), (w - 20, 240), detection_color, -1, 15)
+        cv2.putText(img, "DETECTED", (460, 155),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, Config.COLOR_TEXT_DIM, 2)
+        
+        if show_progress:
+            draw_rounded_rect(img, (20, 260), (w - 20, 360), Config.COLOR_BG_CARD, -1, 15)
+            cv2.putText(img, "HOLD GESTURE TO DETECT", (40, 295),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, Config.COLOR_TEXT_DIM, 2)
+            draw_rounded_rect(img, (40, 310), (w - 40, 340), Config.COLOR_PROGRESS_BG, -1, 10)
+        
+        sentence_y = 380 if show_progress else 260
+        draw_rounded_rect(img, (20, sentence_y), (w - 20, sentence_y + 100), Config.COLOR_BG_CARD, -1, 15)
+        cv2.putText(img, "SENTENCE", (40, sentence_y + 35),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, Config.COLOR_TEXT_DIM, 2)
+        
+        if hud_lines:
+            pt1, pt2 = OverlayRenderer._hud_rect(w, h, hud_lines)
+            draw_rounded_rect(img, pt1, pt2, Config.COLOR_BG_CARD, -1, 15)
+
+    @staticmethod
+    def _draw_over(img, w, h):
+        draw_rounded_rect(img, (0, h - 60), (w, h), Config.COLOR_BG_CARD, -1, 0)
+        
+        controls = [
+            ("SPACE", "Add Space"),
+            ("C", "Clear"),
+            ("S", "Speak"),
+            ("Q", "Quit")
+        ]
+        
+        # Spread the hints over narrower frames, leaving out the labels if any would not fit
+        step = min(280, (w - 40) // len(controls))
+        labels = all(95 + cv2.getTextSize(action, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0][0] < step - 10
+                     for _, action in controls)
+        x_offset = 40
+        for key, action in controls:
+            cv2.rectangle(img, (x_offset, h - 45), (x_offset + 80, h - 20), Config.COLOR_PRIMARY, -1)
+            put_bold_text(img, key, (x_offset + 10, h - 28),
+                          cv2.FONT_HERSHEY_DUPLEX, 0.5, Config.COLOR_TEXT, 1, 1)
+            if labels:
+                put_bold_text(img, action, (x_offset + 95, h - 28),
+                              cv2.FONT_HERSHEY_SIMPLEX, 0.5, Config.COLOR_TEXT_DIM, 1, 1)
+            x_offset += step
+
+    @staticmethod
+    def _rasterize(draw, w, h, *args):
+        # Pixels touched by the drawing come out identical on a black and a
+        # white canvas, which gives an exact coverage mask.
+        black = np.zeros((h, w, 3), np.uint8)
+        white = np.full((h, w, 3), 255, np.uint8)
+        draw(black, w, h, *args)
+        draw(white, w, h, *args)
+        mask = (black == white).all(axis=2).astype(np.uint8) * 255
+        return black, mask
+
+    def _get_static(self, detected, show_progress, hud_lines=0):
+        key = (detected, show_progress, hud_lines)
+        static = self._static.get(key)
+        if static is None:
+            w, h = self._size
+            under, under_mask = self._rasterize(self._draw_under, w, h, detected, show_progress, hud_lines)
+            over, over_mask = self._rasterize(self._draw_over, w, h)
+            covered = np.flatnonzero((under_mask | over_mask).any(axis=1))
+            breaks = np.flatnonzero(np.diff(covered) > 1)
+            starts = np.concatenate(([covered[0]], covered[breaks + 1]))
+            ends = np.concatenate((covered[breaks], [covered[-1]])) + 1
+            rows = [(int(y0), int(y1)) for y0, y1 in zip(starts, ends)]
+            static = (under, under_mask, over, over_mask, rows)
+            self._static[key] = static
+        return static
+
+    def _rounded_rect(self, pt1, pt2, color, radius):
+        draw_rounded_rect(self._work, pt1, pt2, color, -1, radius)
+        draw_rounded_rect(self._mask, pt1, pt2, 255, -1, radius)
+
+    def _text(self, text, org, font, font_scale, color, thickness):
+        cv2.putText(self._work, text, org, font, font_scale, color, thickness)
+        cv2.putText(self._mask, text, org, font, font_scale, 255, thickness)
+
+    def render(self, frame, current_pattern, detected_letter, detected_sentence,
+               is_first_detection, first_detection_progress, speech_status=None, hud_lines=None,
+               suggestions=None):
+        """Draw the overlay onto frame in place and return it"""
+        h, w, _ = frame.shape
+        if self._size != (w, h):
+            self._resize(w, h)
+        
+        show_progress = bool(is_first_detection and first_detection_progress > 0)
+        under, under_mask, over, over_mask, rows = self._get_static(
+            bool(detected_letter), show_progress, len(hud_lines) if hud_lines else 0)
+        
+        for y0, y1 in rows:
+            self._work[y0:y1] = under[y0:y1]
+            self._mask[y0:y1] = under_mask[y0:y1]
+        
+        self._text(current_pattern, (40, 210),
+                   cv2.FONT_HERSHEY_DUPLEX, 1.2, Config.COLOR_PRIMARY, 3)
+        
+        detected_text = detected_letter if detected_letter else "None"
+        text_color = Config.COLOR_TEXT if detected_letter else Config.COLOR_TEXT_DIM
+        self._text(detected_text, (460, 210),
+                   cv2.FONT_HERSHEY_DUPLEX, 1.2, text_color, 3)
+        
+        if show_progress:
+            progress_bar_x = 40
+            progress_bar_y = 310
+            progress_bar_width = w - 80
+            progress_bar_height = 30
+            
+            filled_width = int(progress_bar_width * first_detection_progress)
+            if filled_width > 0:
+                self._rounded_rect((progress_bar_x, progress_bar_y),
+                                   (progress_bar_x + filled_width, progress_bar_y + progress_bar_height),
+                                   Config.COLOR_PROGRESS, 10)
+            
+            percentage_text = PERCENT_STRINGS[min(100, max(0, int(first_detection_progress * 100)))]
+            text_size = self._text_sizes.get(percentage_text)
+            if text_size is None:
+                text_size = cv2.getTextSize(percentage_text, cv2.FONT_HERSHEY_DUPLEX, 0.7, 2)[0]
+                self._text_sizes[percentage_text] = text_size
+            text_x = progress_bar_x + (progress_bar_width - text_size[0]) // 2
+            text_y = progress_bar_y + (progress_bar_height + text_size[1]) // 2
+            self._text(percentage_text, (text_x, text_y),
+                       cv2.FONT_HERSHEY_DUPLEX, 0.7, Config.COLOR_TEXT, 2)
+        
+        sentence_y = 380 if show_progress else 260
+        sentence_display = detected_sentence[-60:] if len(detected_sentence) > 60 else detected_sentence
+        if not sentence_display.strip():
+            sentence_display = "Start making gestures..."
+            sentence_color = Config.COLOR_TEXT_DIM
+        else:
+            sentence_color = Config.COLOR_TEXT
+        self._text(sentence_display, (40, sentence_y + 75),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.9, sentence_color, 2)
+        
+        if suggestions:
+            # Numbered completion chips next to the SENTENCE label, keys 1-3 pick one
+            x = 180
+            for number, word in enumerate(suggestions, 1):
+                text_width = cv2.getTextSize(word, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0][0]
+                if x + text_width + 50 > w - 260:
+                    break
+                self._rounded_rect((x, sentence_y + 12), (x + text_width + 50, sentence_y + 46),
+                                   Config.COLOR_BG_LIGHT, 10)
+                self._text(str(number), (x + 12, sentence_y + 36),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, Config.COLOR_PRIMARY, 2)
+                self._text(word, (x + 36, sentence_y + 36),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, Config.COLOR_TEXT, 2)
+                x += text_width + 65
+        
+        if speech_status is not None and speech_status[0] != SpeechWorker.IDLE:
+            status_text = speech_status[0].upper() + "..."
+            text_size = cv2.getTextSize(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+            self._text(status_text, (w - 40 - text_size[0], sentence_y + 35),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, Config.COLOR_SUCCESS, 2)
+        
+        if hud_lines:
+            (x, y), _ = self._hud_rect(w, h, len(hud_lines))
+            for i, columns in enumerate(hud_lines):
+                color = Config.COLOR_PRIMARY if i == 0 else Config.COLOR_TEXT_DIM
+                for column, offset in zip(columns, (20, 180, 270, 360)):
+                    if column:
+                        self._text(column, (x + offset, y + 32 + i * 24),
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.55, color, 1)
+        
+        for y0, y1 in rows:
+            work = self._work[y0:y1]
+            mask = self._mask[y0:y1]
+            # The control bar is drawn last, on top of anything that runs into it
+            cv2.copyTo(over[y0:y1], over_mask[y0:y1], work)
+            cv2.bitwise_or(mask, over_mask[y0:y1], dst=mask)
+            
+            blend = self._blend[y0:y1]
+            cv2.addWeighted(work, 0.95, frame[y0:y1], 0.05, 0, dst=blend)
+            cv2.copyTo(blend, mask, frame[y0:y1])
+        
+        return frame
+
+_overlay_renderer = OverlayRenderer()
+
+def draw_ui_overlay(frame, current_pattern, detected_letter, detected_sentence, is_first_detection, first_detection_progress,
+                    speech_status=None, hud_lines=None, suggestions=None):
+    """Draw modern UI overlay on the frame"""
+    return _overlay_renderer.render(frame, current_pattern, detected_letter, detected_sentence,
+                                    is_first_detection, first_detection_progress, speech_status, hud_lines,
+                                    suggestions)
 
 def show_summary_screen():
     """Display scrolling project summary screen"""
@@ -376,151 +889,3660 @@ def show_summary_screen():
     cv2.destroyAllWindows()
 
 # ==========================
-# MAIN APPLICATION
+# SPEECH
 # ==========================
 
-def main():
-    """Main application loop"""
-    print("\n" + "="*60)
-    print("  HAVI - Hand AI Voice Interface")
-    print("="*60 + "\n")
+class OfflineTTSBackend:
+    """Local speech synthesis through pyttsx3, no network needed"""
     
-    loading_animation("Initializing system", 3)
-    play_intro()
+    name = "offline"
     
-    try:
-        cap = initialize_camera()
-    except Exception as e:
-        print(f"[FATAL] Cannot proceed without camera: {e}")
-        return
+    def __init__(self):
+        import pyttsx3
+        self._pyttsx3 = pyttsx3
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Start a driver now so a missing espeak/SAPI5/NSSS makes create_tts_backend fall back,
+        # instead of every utterance failing later
+        self._engine()
     
-    window_name = "HAVI (Hand AI Voice Interface)"
+    def _engine(self):
+        # pyttsx3 drivers (SAPI5 in particular) are bound to the thread that created them
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            engine = self._pyttsx3.Engine()
+            self._local.engine = engine
+        return engine
+    
+    def synthesize(self, text, voice, language):
+        with self._lock:
+            engine = self._engine()
+            if voice:
+                engine.setProperty("voice", voice)
+            fd, path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            try:
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+                with open(path, "rb") as f:
+                    return f.read()
+            finally:
+                os.remove(path)
+
+class GTTSBackend:
+    """Google Text-to-Speech backend, requires internet"""
+    
+    name = "gtts"
+    
+    def synthesize(self, text, voice, language):
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=language).write_to_fp(buffer)
+        return buffer.getvalue()
+
+TTS_BACKENDS = {
+    "offline": OfflineTTSBackend,
+    "gtts": GTTSBackend,
+}
+
+def create_tts_backend(name=Config.TTS_BACKEND):
+    """Create the named TTS backend, falling back to the others if it is unavailable"""
+    names = [name] + [other for other in TTS_BACKENDS if other != name]
+    for candidate in names:
+        try:
+            backend = TTS_BACKENDS[candidate]()
+        except Exception as e:
+            print(f"[WARNING] TTS backend '{candidate}' unavailable: {e}")
+            continue
+        if candidate != name:
+            print(f"[INFO] Using TTS backend '{candidate}'")
+        return backend
+    raise RuntimeError("No TTS backend available")
+
+class AudioCache:
+    """Content-addressed audio cache: in-memory LRU in front of an on-disk store"""
+    
+    def __init__(self, directory=Config.TTS_CACHE_DIR, max_disk_bytes=Config.TTS_CACHE_MAX_BYTES,
+                 max_memory_bytes=Config.TTS_MEMORY_CACHE_BYTES):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(directory)
+                                   if entry.name.endswith(".audio"))
+    
+    @staticmethod
+    def key(text, voice, language, backend):
+        """Return the cache key for a synthesis request"""
+        raw = "\0".join([backend, language, voice or "", text])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".audio")
+    
+    def _remember(self, key, data):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+    
+    def get(self, key):
+        """Return cached audio bytes or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+            if not self.directory:
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                return None
+            self._remember(key, data)
+            return data
+    
+    def put(self, key, data):
+        """Store audio bytes in memory and on disk"""
+        with self._lock:
+            self._remember(key, data)
+            if not self.directory:
+                return
+            path = self._path(key)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._disk_bytes += len(data) - previous
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk(keep=path)
+    
+    def _evict_disk(self, keep):
+        entries = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith(".audio")),
+                         key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            if entry.path == keep:
+                continue
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+
+_mixer_lock = threading.Lock()
+
+def ensure_mixer():
+    """Import pygame and initialize its mixer once, returning pygame.mixer"""
+    with _mixer_lock:
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        import pygame
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        return pygame.mixer
+
+class SpeechEngine:
+    """Turn text into audio through a cached TTS backend and play it on the shared mixer"""
+    
+    def __init__(self, backend=None, cache=None, voice=Config.TTS_VOICE, language=Config.TTS_LANGUAGE):
+        self.backend = backend if backend is not None else create_tts_backend()
+        self.cache = cache if cache is not None else AudioCache()
+        self.voice = voice
+        self.language = language
+    
+    def synthesize(self, text):
+        """Return audio bytes for text, synthesizing only on a cache miss"""
+        key = AudioCache.key(text, self.voice, self.language, self.backend.name)
+        data = self.cache.get(key)
+        if data is None:
+            data = self.backend.synthesize(text, self.voice, self.language)
+            self.cache.put(key, data)
+        return data
+    
+    def warm(self, phrases):
+        """Pre-synthesize phrases so they play straight from the cache"""
+        for text in dict.fromkeys(phrases):
+            try:
+                self.synthesize(text)
+            except Exception as e:
+                print(f"[WARNING] Could not pre-synthesize '{text}': {e}")
+    
+    def play(self, data, should_stop=None):
+        """Play audio bytes and wait until playback ends or should_stop() returns True"""
+        mixer = ensure_mixer()
+        sound = mixer.Sound(file=io.BytesIO(data))
+        channel = sound.play()
+        while channel is not None and channel.get_busy():
+            if should_stop is not None and should_stop():
+                channel.stop()
+                return False
+            time.sleep(0.02)
+        return True
+    
+    def speak(self, text):
+        """Synthesize text and play it"""
+        self.play(self.synthesize(text))
+
+class SpeechWorker:
+    """Synthesize and play queued text on a background thread.
+
+    enqueue() adds an utterance, cancel() drops everything still pending and
+    interrupt() also cuts off the utterance that is playing. say() interrupts
+    and then enqueues, so a new request always preempts the old one.
+    """
+    
+    IDLE = "idle"
+    SYNTHESIZING = "synthesizing"
+    SPEAKING = "speaking"
+    
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._interrupts = 0
+        self._current = None
+        self._state = self.IDLE
+        self._thread = threading.Thread(target=self._run, name="havi-speech", daemon=True)
+        self._thread.start()
+    
+    @property
+    def status(self):
+        """Return (state, text) for the utterance being processed"""
+        with self._lock:
+            return self._state, self._current
+    
+    def enqueue(self, text):
+        with self._lock:
+            self._jobs.put((self._generation, text))
+    
+    def cancel(self):
+        """Drop pending utterances, letting the current one finish"""
+        with self._lock:
+            self._generation += 1
+            shutdown = False
+            while True:
+                try:
+                    shutdown = self._jobs.get_nowait() is None or shutdown
+                except queue.Empty:
+                    break
+            if shutdown:
+                self._jobs.put(None)
+    
+    def interrupt(self):
+        """Drop pending utterances and stop the one being spoken"""
+        with self._lock:
+            self._interrupts += 1
+        self.cancel()
+    
+    def say(self, text):
+        """Interrupt whatever is being spoken and speak text instead"""
+        self.interrupt()
+        self.enqueue(text)
+    
+    def _set_state(self, state, text=None):
+        with self._lock:
+            self._state = state
+            self._current = text
+    
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            generation, text = job
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                interrupts = self._interrupts
+            interrupted = lambda: self._interrupts != interrupts
+            try:
+                if self._engine is None:
+                    self._engine = get_speech_engine()
+                self._set_state(self.SYNTHESIZING, text)
+                data = self._engine.synthesize(text)
+                if interrupted():
+                    continue
+                self._set_state(self.SPEAKING, text)
+                if self._engine.play(data, interrupted):
+                    print("[SUCCESS] Speech output")
+            except Exception as e:
+                print(f"[ERROR] Failed to speak: {e}")
+            finally:
+                self._set_state(self.IDLE)
+    
+    def stop(self, timeout=1.0):
+        """Stop speaking and shut the worker down"""
+        self.interrupt()
+        self._jobs.put(None)
+        self._thread.join(timeout=timeout)
+
+_speech_engine = None
+_speech_engine_lock = threading.Lock()
+
+def get_speech_engine():
+    """Return the shared speech engine, creating it on first use"""
+    global _speech_engine
+    with _speech_engine_lock:
+        if _speech_engine is None:
+            _speech_engine = SpeechEngine()
+        return _speech_engine
+
+def warm_speech_cache(phrases):
+    """Pre-synthesize phrases with the shared speech engine"""
     try:
-        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-        cv2.resizeWindow(window_name, Config.CAMERA_WIDTH, Config.CAMERA_HEIGHT)
+        get_speech_engine().warm(phrases)
     except Exception as e:
-        print(f"[ERROR] Cannot create window: {e}")
-        cap.release()
-        return
+        print(f"[WARNING] Speech output unavailable: {e}")
+
+class StreamingSpeech:
+    """Speak words and phrases as they are confirmed instead of waiting for S.
+
+    push() queues a chunk of text. A synthesis thread turns chunks into
+    decoded sounds while a playback thread queues each sound behind the one
+    playing on a reserved mixer channel, so chunks play back to back without
+    gaps. At most backlog chunks wait at any time and a chunk that cannot
+    start within max_latency seconds of its push is dropped, oldest first,
+    so speech never falls far behind the signer.
+    """
     
-    detector = HandDetector(detectionCon=Config.DETECTION_CONFIDENCE, maxHands=Config.MAX_HANDS)
+    def __init__(self, engine=None, backlog=Config.SPEECH_STREAM_BACKLOG,
+                 max_latency=Config.SPEECH_STREAM_MAX_LATENCY, clock=time.monotonic):
+        self._engine = engine
+        self.backlog = backlog
+        self.max_latency = max_latency
+        self.clock = clock
+        self._texts = []
+        self._sounds = []
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._running = True
+        self._state = SpeechWorker.IDLE
+        self._current = None
+        self._channel = None
+        self.dropped = 0
+        self.latencies = []
+        self._threads = [threading.Thread(target=self._synthesize_loop, name="havi-stream-synth", daemon=True),
+                         threading.Thread(target=self._play_loop, name="havi-stream-play", daemon=True)]
+        for thread in self._threads:
+            thread.start()
     
-    detected_sentence = ""
-    detected_letters = []
-    last_letter = ""
-    last_letter_time = 0
+    @property
+    def status(self):
+        """Return (state, text) like SpeechWorker.status"""
+        with self._cond:
+            return self._state, self._current
     
-    is_first_detection = True
-    first_detection_start_time = None
-    first_detection_letter = None
+    def push(self, text):
+        with self._cond:
+            self._texts.append((self._generation, self.clock(), text))
+            self._trim()
+            self._cond.notify_all()
     
-    print("\n[READY] System initialized. Starting gesture recognition...")
-    print("[INFO] Show a gesture and hold for 2.5 seconds for first detection")
-    print("[INFO] Subsequent detections require 1.5 seconds\n")
+    def _trim(self):
+        # Sounds were pushed before any text still waiting, so they are the oldest
+        while len(self._sounds) + len(self._texts) > self.backlog:
+            (self._sounds if self._sounds else self._texts).pop(0)
+            self.dropped += 1
     
-    try:
+    def _stale(self, pushed):
+        if self.clock() - pushed > self.max_latency:
+            self.dropped += 1
+            return True
+        return False
+    
+    def interrupt(self):
+        """Drop every pending chunk and stop the one playing"""
+        with self._cond:
+            self._generation += 1
+            self._texts.clear()
+            self._sounds.clear()
+            if self._channel is not None:
+                self._channel.stop()
+            self._cond.notify_all()
+    
+    def _synthesize_loop(self):
         while True:
-            success, frame = cap.read()
-            if not success:
-                print("[ERROR] Failed to read frame from camera")
-                break
-            
-            frame = cv2.flip(frame, 1)
-            hands, frame = detector.findHands(frame)
+            with self._cond:
+                self._cond.wait_for(lambda: self._texts or not self._running)
+                if not self._running:
+                    return
+                generation, pushed, text = self._texts.pop(0)
+                if self._stale(pushed):
+                    continue
+                if self._channel is None or not self._channel.get_busy():
+                    self._state, self._current = SpeechWorker.SYNTHESIZING, text
+            try:
+                if self._engine is None:
+                    self._engine = get_speech_engine()
+                data = self._engine.synthesize(text)
+                # Decoding here keeps the playback thread free to queue without delay
+                sound = ensure_mixer().Sound(file=io.BytesIO(data))
+            except Exception as e:
+                print(f"[ERROR] Failed to synthesize '{text}': {e}")
+                sound = None
+            with self._cond:
+                if sound is not None and generation == self._generation:
+                    self._sounds.append((pushed, text, sound))
+                    self._trim()
+                    self._cond.notify_all()
+                elif self._state == SpeechWorker.SYNTHESIZING:
+                    self._state, self._current = SpeechWorker.IDLE, None
+    
+    def _play_loop(self):
+        while True:
+            with self._cond:
+                # Poll the channel so a sound is queued as soon as there is room behind the playing one
+                self._cond.wait(0.02)
+                if not self._running:
+                    return
+                channel = self._channel
+                busy = channel is not None and channel.get_busy()
+                if not self._sounds:
+                    if not busy and self._state == SpeechWorker.SPEAKING:
+                        self._state, self._current = SpeechWorker.IDLE, None
+                    continue
+                if busy and channel.get_queue() is not None:
+                    continue
+                pushed, text, sound = self._sounds.pop(0)
+                if self._stale(pushed):
+                    continue
+                if channel is None:
+                    mixer = ensure_mixer()
+                    # Keep one channel for streaming so other sounds never take it
+                    mixer.set_reserved(1)
+                    channel = self._channel = mixer.Channel(0)
+                if busy:
+                    channel.queue(sound)
+                else:
+                    channel.play(sound)
+                self.latencies.append(self.clock() - pushed)
+                self._state, self._current = SpeechWorker.SPEAKING, text
+    
+    def stop(self, timeout=1.0):
+        """Stop speaking and shut both threads down"""
+        self.interrupt()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        if self.latencies:
+            p50, p95, _ = latency_summary(self.latencies)
+            print(f"[INFO] Streaming speech: {len(self.latencies)} chunks, push to playback queue "
+                  f"p50 {p50:.0f} ms p95 {p95:.0f} ms, {self.dropped} dropped")
+
+# ==========================
+# FRAME CAPTURE
+# ==========================
+
+class FrameGrabber:
+    """Grab camera frames on a background thread and hand out only the newest one.
+
+    Frames are decoded into a small ring of reused buffers. A frame returned by
+    read() stays valid until the next call to read().
+    """
+
+    def __init__(self, cap, buffers=Config.CAPTURE_BUFFERS, timeout=Config.CAPTURE_TIMEOUT):
+        if buffers < 3:
+            raise ValueError("FrameGrabber needs at least 3 buffers")
+        self.cap = cap
+        self.timeout = timeout
+        self._buffers = [None] * buffers
+        self._latest = -1
+        self._reading = -1
+        self._writing = -1
+        self._running = False
+        self._failed = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self._settings = []
+        self._interval = 0.0
+        self._next_decode = 0.0
+        
+        self.captured = 0
+        self.dropped = 0
+        self.consumed = 0
+        self.skipped = 0
+    
+    def start(self):
+        """Start the grabber thread"""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="havi-capture", daemon=True)
+            self._thread.start()
+        return self
+    
+    def _free_slot(self):
+        count = len(self._buffers)
+        for step in range(1, count + 1):
+            slot = (self._writing + step) % count
+            if slot != self._latest and slot != self._reading:
+                return slot
+        raise RuntimeError("No free capture buffer")
+    
+    def _run(self):
+        while self._running:
+            with self._cond:
+                slot = self._free_slot()
+                self._writing = slot
+                settings, self._settings = self._settings, []
+            for prop, value in settings:
+                self.cap.set(prop, value)
             
-            detected_letter = None
-            hands_data = []
-            current_pattern = "-----"
-            first_detection_progress = 0.0
+            if self._interval and time.monotonic() < self._next_decode:
+                # Keep draining the driver's queue without paying for decoding
+                if not self.cap.grab():
+                    with self._cond:
+                        self._failed = True
+                        self._cond.notify_all()
+                    break
+                self.skipped += 1
+                continue
+            self._next_decode = time.monotonic() + self._interval
             
-            if hands:
-                for hand in hands:
-                    fingers = detector.fingersUp(hand)
-                    center = hand['center']
-                    hands_data.append({'fingers': fingers, 'center': center})
-                
-                if len(hands_data) == 1:
-                    current_pattern = ''.join(map(str, hands_data[0]['fingers']))
-                elif len(hands_data) == 2:
-                    hands_sorted = sorted(hands_data, key=lambda h: h['center'][0])
-                    left = ''.join(map(str, hands_sorted[0]['fingers']))
-                    right = ''.join(map(str, hands_sorted[1]['fingers']))
-                    current_pattern = f"{left} {right}"
-                
-                detected_letter = get_letter_from_pattern(hands_data)
-                
-                if detected_letter:
-                    current_time = time.time()
-                    
-                    if is_first_detection:
-                        if first_detection_letter != detected_letter:
-                            first_detection_letter = detected_letter
-                            first_detection_start_time = current_time
-                        
-                        if first_detection_start_time is not None:
-                            time_held = current_time - first_detection_start_time
-                            first_detection_progress = min(time_held / Config.FIRST_LETTER_DELAY, 1.0)
-                        else:
-                            time_held = 0
-                            first_detection_progress = 0.0
-                        
-                        if time_held >= Config.FIRST_LETTER_DELAY:
-                            detected_letters.append(detected_letter)
-                            detected_sentence += detected_letter + " "
-                            last_letter = detected_letter
-                            last_letter_time = current_time
-                            is_first_detection = False
-                            first_detection_letter = None
-                            print(f"[DETECTED] First letter: {detected_letter}")
-                    else:
-                        if current_time - last_letter_time >= Config.LETTER_DETECTION_DELAY:
-                            detected_letters.append(detected_letter)
-                            detected_sentence += detected_letter + " "
-                            last_letter = detected_letter
-                            last_letter_time = current_time
-                            print(f"[DETECTED] {detected_letter}")
+            buffer = self._buffers[slot]
+            if buffer is None:
+                success, image = self.cap.read()
             else:
-                first_detection_letter = None
-                first_detection_start_time = None
+                success, image = self.cap.read(buffer)
             
-            frame = draw_ui_overlay(frame, current_pattern, detected_letter, 
-                                   detected_sentence, is_first_detection, first_detection_progress)
-            
-            cv2.imshow(window_name, frame)
-            
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                print("\n[INFO] Exiting application...")
-                break
-            elif key == ord(' '):
-                detected_sentence += " "
-                detected_letters.append(" ")
-                print("[ACTION] Space added")
-            elif key == ord('c'):
-                detected_sentence = ""
-                detected_letters.clear()
-                is_first_detection = True
-                first_detection_letter = None
-                print("[ACTION] Sentence cleared")
-            elif key == ord('s'):
-                speak_detected_letters(detected_letters)
+            with self._cond:
+                if not success:
+                    self._failed = True
+                    self._cond.notify_all()
+                    break
+                # read() only fills the buffer in place when shape and type match
+                self._buffers[slot] = image
+                if self._latest != -1:
+                    self.dropped += 1
+                self._latest = slot
+                self.captured += 1
+                self._cond.notify_all()
     
-    except KeyboardInterrupt:
-        print("\n[INFO] Interrupted by user")
-    except Exception as e:
-        print(f"[ERROR] Unexpected error in main loop: {e}")
-    finally:
-        cap.release()
-        cv2.destroyAllWindows()
+    def read(self):
+        """Return (success, frame) with the newest frame, waiting for one if needed"""
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._latest != -1 or self._failed or not self._running,
+                self.timeout)
+            if not ready or self._latest == -1:
+                return False, None
+            self._reading = self._latest
+            self._latest = -1
+            self.consumed += 1
+            return True, self._buffers[self._reading]
+    
+    def set_rate(self, fps=None):
+        """Decode at most fps frames per second (None decodes every frame)"""
+        self._interval = 1.0 / fps if fps else 0.0
+        self._next_decode = 0.0
     
-    pygame.mixer.init()
-    pygame.mixer.music.load("havi_outro.mp3")
-    pygame.mixer.music.play()
+    def isOpened(self):
+        return self.cap.isOpened() and not self._failed
+    
+    def get(self, prop):
+        return self.cap.get(prop)
+    
+    def set(self, prop, value):
+        """Change a capture property; while grabbing it is applied between two reads"""
+        with self._cond:
+            if self._thread is not None:
+                self._settings.append((prop, value))
+                return True
+        return self.cap.set(prop, value)
+    
+    def stats(self):
+        """Return captured/dropped/consumed/skipped frame counters"""
+        with self._cond:
+            return {"captured": self.captured, "dropped": self.dropped, "consumed": self.consumed,
+                    "skipped": self.skipped}
+    
+    def release(self):
+        """Stop the grabber thread and release the camera"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout)
+            self._thread = None
+        self.cap.release()
 
-    show_summary_screen()
+CaptureMode = namedtuple("CaptureMode", ["width", "height", "fourcc", "fps"])
+
+class FrameContext:
+    """Image buffers reused by every iteration of a frame loop.
+
+    read() decodes into the same capture buffer each time (a FrameGrabber
+    recycles its own ring instead), mirror() flips into a second buffer and
+    downscale() resizes for hand detection into a third. A buffer is only
+    reallocated when the frame size changes, so what one of these methods
+    returns stays valid until the same method is called again.
+    """
     
-    print("\n[GOODBYE] Thank you for using HAVI!")
+    def __init__(self):
+        self.captured = None
+        self.mirrored = None
+        self.small = None
+        self.allocations = 0
+    
+    def _buffer(self, buffer, shape):
+        if buffer is None or buffer.shape != shape:
+            self.allocations += 1
+            return np.empty(shape, np.uint8)
+        return buffer
+    
+    def read(self, cap):
+        """Return (success, frame) from cap, decoded into the capture buffer when possible"""
+        if isinstance(cap, FrameGrabber) or self.captured is None:
+            success, frame = cap.read()
+        else:
+            success, frame = cap.read(self.captured)
+        if success and not isinstance(cap, FrameGrabber) and frame is not self.captured:
+            # First frame, or read() reallocated because the capture size changed
+            self.allocations += 1
+            self.captured = frame
+        return success, frame
+    
+    def mirror(self, frame):
+        """Return frame flipped horizontally into the mirror buffer"""
+        self.mirrored = self._buffer(self.mirrored, frame.shape)
+        return cv2.flip(frame, 1, dst=self.mirrored)
+    
+    def downscale(self, frame, size):
+        """Return frame resized to size (width, height) into the inference buffer"""
+        self.small = self._buffer(self.small, (size[1], size[0]) + frame.shape[2:])
+        return cv2.resize(frame, size, dst=self.small, interpolation=cv2.INTER_AREA)
 
+def fourcc_name(code):
+    """Decode a CAP_PROP_FOURCC value such as 1196444237.0 into 'MJPG'"""
+    code = int(code)
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ")
 
-if __name__ == "__main__":
-    main()
+def apply_capture_mode(cap, width, height, fourcc=None, fps=None):
+    """Request a mode and return the CaptureMode the device actually reports (fps as reported)"""
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    return CaptureMode(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                       fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)), cap.get(cv2.CAP_PROP_FPS))
+
+def measure_capture_fps(cap, frames=Config.CAPTURE_MEASURE_FRAMES, warmup=3, clock=time.perf_counter):
+    """Read frames and return the delivered frames per second, or 0.0 if reading fails"""
+    for _ in range(warmup):
+        if not cap.read()[0]:
+            return 0.0
+    start = clock()
+    for _ in range(frames):
+        if not cap.read()[0]:
+            return 0.0
+    elapsed = clock() - start
+    return frames / elapsed if elapsed > 0 else float("inf")
+
+def negotiate_capture_mode(cap, target_fps=Config.CAPTURE_TARGET_FPS, modes=Config.CAPTURE_MODES,
+                           fourccs=Config.CAPTURE_FOURCCS, clock=time.perf_counter):
+    """Measure the candidate modes on an open capture and switch to the best one.
+
+    Returns (chosen CaptureMode with measured fps, all measurements). The best
+    mode is the largest one that reaches 90% of target_fps, or the fastest one
+    if none does. Modes the device silently replaces with another are measured
+    once, and smaller sizes are skipped once a FOURCC reaches the target.
+    """
+    measured = {}
+    for fourcc in fourccs:
+        for width, height in sorted(modes, key=lambda mode: -mode[0] * mode[1]):
+            actual = apply_capture_mode(cap, width, height, fourcc, target_fps)
+            key = actual[:3]
+            if key not in measured:
+                measured[key] = actual._replace(fps=measure_capture_fps(cap, clock=clock))
+            if measured[key].fps >= target_fps * 0.9:
+                break
+    if not measured:
+        raise ValueError("No capture modes to try")
+    
+    results = list(measured.values())
+    fast = [mode for mode in results if mode.fps >= target_fps * 0.9]
+    if fast:
+        best = max(fast, key=lambda mode: (mode.width * mode.height, mode.fps))
+    else:
+        best = max(results, key=lambda mode: (mode.fps, mode.width * mode.height))
+    apply_capture_mode(cap, best.width, best.height, best.fourcc, target_fps)
+    return best, results
+
+# ==========================
+# PERFORMANCE INSTRUMENTATION
+# ==========================
+
+PIPELINE_STAGES = ("cap.read", "flip", "findHands", "fingersUp", "recognize",
+                   "draw_hands", "overlay", "imshow", "waitKey")
+
+class NullStageTimer:
+    """Stand-in used when profiling is off; every call is a no-op"""
+    
+    enabled = False
+    
+    def begin_frame(self):
+        pass
+    
+    def lap(self, stage):
+        pass
+    
+    def end_frame(self, dropped=None):
+        pass
+    
+    def hud_lines(self):
+        return None
+    
+    def close(self):
+        pass
+
+NULL_TIMER = NullStageTimer()
+
+class StageTimer:
+    """Time named stages of the frame loop with rolling p50/p95/p99, fps and dropped frames.
+
+    Call begin_frame() at the top of the loop, lap(stage) after each stage and
+    end_frame() at the bottom. Summaries can be exported periodically to a
+    .csv or .jsonl file.
+    """
+    
+    enabled = True
+    
+    def __init__(self, stages=PIPELINE_STAGES, window=Config.PROFILE_WINDOW, export_path=None,
+                 export_interval=Config.PROFILE_EXPORT_INTERVAL):
+        self.stages = tuple(stages) + ("frame",)
+        self.window = window
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.frames = 0
+        self.dropped = 0
+        self._samples = {stage: np.zeros(window) for stage in self.stages}
+        self._counts = dict.fromkeys(self.stages, 0)
+        self._frame_times = np.zeros(window)
+        self._frame_start = None
+        self._mark = None
+        self._export_file = None
+        self._next_export = time.perf_counter() + export_interval
+        self._hud = None
+        self._next_hud = 0.0
+    
+    def _record(self, stage, value):
+        count = self._counts[stage]
+        self._samples[stage][count % self.window] = value
+        self._counts[stage] = count + 1
+    
+    def begin_frame(self):
+        self._frame_start = self._mark = time.perf_counter()
+    
+    def lap(self, stage):
+        now = time.perf_counter()
+        self._record(stage, now - self._mark)
+        self._mark = now
+    
+    def end_frame(self, dropped=None):
+        now = time.perf_counter()
+        self._record("frame", now - self._frame_start)
+        self._frame_times[self.frames % self.window] = now
+        self.frames += 1
+        if dropped is not None:
+            self.dropped = dropped
+        if self.export_path and now >= self._next_export:
+            self._next_export = now + self.export_interval
+            self.export()
+    
+    @property
+    def fps(self):
+        count = min(self.frames, self.window)
+        if count < 2:
+            return 0.0
+        newest = self._frame_times[(self.frames - 1) % self.window]
+        oldest = self._frame_times[(self.frames - count) % self.window]
+        return (count - 1) / (newest - oldest) if newest > oldest else 0.0
+    
+    def summary(self):
+        """Return {stage: (p50, p95, p99)} in milliseconds over the rolling window"""
+        result = {}
+        for stage in self.stages:
+            count = min(self._counts[stage], self.window)
+            if count:
+                p50, p95, p99 = np.percentile(self._samples[stage][:count] * 1000, [50, 95, 99])
+                result[stage] = (float(p50), float(p95), float(p99))
+        return result
+    
+    def hud_lines(self):
+        """Return rows of column texts for the on-screen performance card, refreshed twice a second"""
+        now = time.perf_counter()
+        if self._hud is None or now >= self._next_hud:
+            self._next_hud = now + 0.5
+            summary = self.summary()
+            self._hud = [(f"FPS {self.fps:.1f}", f"DROPPED {self.dropped}", "", ""),
+                         ("STAGE (ms)", "p50", "p95", "p99")]
+            for stage in self.stages:
+                p50, p95, p99 = summary.get(stage, (0.0, 0.0, 0.0))
+                self._hud.append((stage, f"{p50:.2f}", f"{p95:.2f}", f"{p99:.2f}"))
+        return self._hud
+    
+    def export(self):
+        """Append the current summary to the export file"""
+        if self._export_file is None:
+            new_file = not os.path.exists(self.export_path) or os.path.getsize(self.export_path) == 0
+            self._export_file = open(self.export_path, "a", encoding="utf-8")
+            if new_file and not self.export_path.endswith(".jsonl"):
+                self._export_file.write("time,stage,p50_ms,p95_ms,p99_ms,fps,dropped\n")
+        timestamp = time.time()
+        summary = self.summary()
+        if self.export_path.endswith(".jsonl"):
+            record = {"time": timestamp, "fps": self.fps, "dropped": self.dropped,
+                      "stages": {stage: {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+                                 for stage, (p50, p95, p99) in summary.items()}}
+            self._export_file.write(json.dumps(record) + "\n")
+        else:
+            for stage, (p50, p95, p99) in summary.items():
+                self._export_file.write(f"{timestamp:.3f},{stage},{p50:.3f},{p95:.3f},{p99:.3f},"
+                                        f"{self.fps:.2f},{self.dropped}\n")
+        self._export_file.flush()
+    
+    def close(self):
+        if self.export_path and self.frames:
+            self.export()
+        if self._export_file is not None:
+            self._export_file.close()
+            self._export_file = None
+
+ResolutionLevel = namedtuple("ResolutionLevel", ["width", "height", "inference_scale"])
+
+def resolution_levels(width, height, inference_scale, modes=Config.CAPTURE_MODES,
+                      scales=Config.RESOLUTION_INFERENCE_SCALES, capture=True,
+                      min_capture=Config.RESOLUTION_MIN_CAPTURE):
+    """Quality levels from best to cheapest.
+
+    The inference scale is lowered first since that needs no camera change.
+    Smaller capture sizes down to min_capture follow, with the inference scale
+    raised so hand detection keeps seeing at least as many pixels as at the
+    smallest scale.
+    """
+    levels = [ResolutionLevel(width, height, inference_scale)]
+    levels += [ResolutionLevel(width, height, scale) for scale in sorted(scales, reverse=True)
+               if scale < inference_scale]
+    min_width = width * levels[-1].inference_scale
+    if capture:
+        for mode_width, mode_height in sorted(modes, key=lambda mode: -mode[0] * mode[1]):
+            if mode_width * mode_height < width * height and mode_width >= min_capture[0] \
+                    and mode_height >= min_capture[1]:
+                levels.append(ResolutionLevel(mode_width, mode_height, min(1.0, min_width / mode_width)))
+    return levels
+
+class ResolutionController:
+    """Step capture or inference resolution down or up to keep the loop fps inside a band.
+
+    tick() is called once per frame and returns the new ResolutionLevel when
+    the level changes, else None. Given busy, the time the frame took to
+    process, fps is the rate that processing alone could sustain, so a camera
+    that delivers fewer frames than it reports does not read as overload;
+    without it fps is the loop rate. fps has to stay below the band for settle
+    seconds before stepping down, and above it for twice that before stepping
+    up. A step up that has to be undone soon after blocks further step ups for
+    a backoff period that doubles each time, so the level does not oscillate.
+    """
+    
+    def __init__(self, levels, target_fps, band=Config.RESOLUTION_FPS_BAND,
+                 settle=Config.RESOLUTION_SETTLE_SECONDS, clock=time.monotonic):
+        self.levels = list(levels)
+        self.level = 0
+        self.low = band[0] * target_fps
+        self.high = band[1] * target_fps
+        self.settle = settle
+        self.clock = clock
+        self.fps = None
+        self.changes = 0
+        self._last = None
+        self._changed_at = clock()
+        self._direction = 0
+        self._outside_since = None
+        self._raised_at = None
+        self._blocked_until = 0.0
+        self._backoff = settle * 5
+    
+    @property
+    def current(self):
+        return self.levels[self.level]
+    
+    def reset(self, now=None):
+        """Forget the fps measurement, e.g. after the loop was deliberately slowed down"""
+        self.fps = None
+        self._last = None
+        self._direction = 0
+        self._changed_at = self.clock() if now is None else now
+    
+    def tick(self, now=None, busy=None):
+        now = self.clock() if now is None else now
+        if busy is not None:
+            rate = 1.0 / max(busy, 1e-6)
+        elif self._last is not None and now > self._last:
+            rate = 1.0 / (now - self._last)
+        else:
+            rate = None
+        if rate is not None:
+            self.fps = rate if self.fps is None else self.fps * 0.9 + rate * 0.1
+        self._last = now
+        if self.fps is None or now - self._changed_at < self.settle:
+            return None
+        
+        if self.fps < self.low and self.level < len(self.levels) - 1:
+            direction = 1
+        elif self.fps > self.high and self.level > 0 and now >= self._blocked_until:
+            direction = -1
+        else:
+            self._direction = 0
+            return None
+        if direction != self._direction:
+            self._direction = direction
+            self._outside_since = now
+            return None
+        if now - self._outside_since < (self.settle if direction > 0 else self.settle * 2):
+            return None
+        
+        if direction > 0 and self._raised_at is not None and now - self._raised_at < self.settle * 3:
+            # The last step up could not be sustained
+            self._blocked_until = now + self._backoff
+            self._backoff *= 2
+        self._raised_at = now if direction < 0 else None
+        self.level += direction
+        self.changes += 1
+        self.fps = None
+        self._last = None
+        self._direction = 0
+        self._changed_at = now
+        return self.current
+
+def apply_resolution_level(cap, pipeline, level):
+    """Switch a capture and pipeline to a ResolutionLevel"""
+    pipeline.inference_scale = level.inference_scale
+    if (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))) != level[:2]:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, level.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, level.height)
+
+# ==========================
+# HAND DETECTION
+# ==========================
+
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (17, 18), (18, 19), (19, 20), (0, 17)
+)
+
+def create_hand_detector():
+    """Load MediaPipe through cvzone on first use and create the configured detector"""
+    from cvzone.HandTrackingModule import HandDetector
+    return HandDetector(detectionCon=Config.DETECTION_CONFIDENCE, maxHands=Config.MAX_HANDS)
+
+def _detect(detector, img):
+    # Older cvzone releases return only the hands list when draw=False
+    result = detector.findHands(img, draw=False)
+    return result[0] if isinstance(result, tuple) else result
+
+def scale_hand(hand, sx, sy):
+    """Map a cvzone hand dict from inference coordinates to display coordinates in place"""
+    hand['lmList'] = [[int(round(x * sx)), int(round(y * sy)), int(round(z * sx))]
+                      for x, y, z in hand['lmList']]
+    x, y, w, h = hand['bbox']
+    hand['bbox'] = (int(round(x * sx)), int(round(y * sy)), int(round(w * sx)), int(round(h * sy)))
+    cx, cy = hand['center']
+    hand['center'] = (int(round(cx * sx)), int(round(cy * sy)))
+    return hand
+
+def draw_hands(img, hands):
+    """Draw landmarks, bounding box and hand type the way cvzone does"""
+    for hand in hands:
+        points = [(lm[0], lm[1]) for lm in hand['lmList']]
+        for a, b in HAND_CONNECTIONS:
+            cv2.line(img, points[a], points[b], (224, 224, 224), 2)
+        for point in points:
+            cv2.circle(img, point, 3, (255, 255, 255), -1)
+            cv2.circle(img, point, 2, (0, 0, 255), -1)
+        x, y, w, h = hand['bbox']
+        cv2.rectangle(img, (x - 20, y - 20), (x + w + 20, y + h + 20), (255, 0, 255), 2)
+        cv2.putText(img, hand['type'], (x - 30, y - 30), cv2.FONT_HERSHEY_PLAIN,
+                    2, (255, 0, 255), 2)
+
+def find_hands(detector, frame, scale=Config.INFERENCE_SCALE, draw=True, context=None):
+    """Detect hands on a downscaled copy of frame and return them in frame coordinates.
+
+    With a FrameContext the downscaled copy goes into its reused buffer.
+    """
+    if scale >= 1.0:
+        hands = _detect(detector, frame)
+    else:
+        h, w = frame.shape[:2]
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        if context is not None:
+            small = context.downscale(frame, size)
+        else:
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        hands = _detect(detector, small)
+        sx = w / small.shape[1]
+        sy = h / small.shape[0]
+        for hand in hands:
+            scale_hand(hand, sx, sy)
+    if draw:
+        draw_hands(frame, hands)
+    return hands
+
+def add_fingers(detector, hands):
+    """Store finger states on each hand dict, so the hands can be classified directly"""
+    for hand in hands:
+        # Finger states are computed once per detection and reused by carried-forward hands
+        if 'fingers' not in hand:
+            hand['fingers'] = detector.fingersUp(hand)
+    return hands
+
+def get_hands_data(detector, hands):
+    """Collect finger states and centers for pattern matching"""
+    add_fingers(detector, hands)
+    return [{'fingers': hand['fingers'], 'center': hand['center']} for hand in hands]
+
+class DetectionScheduler:
+    """Run hand detection every N frames, adapting N to a per-frame latency budget.
+
+    Between detections the last hands are carried forward, extrapolated along
+    their recent motion so the overlay stays smooth.
+    """
+    
+    def __init__(self, budget_ms=Config.DETECTION_BUDGET_MS, max_stride=Config.DETECTION_MAX_STRIDE,
+                 min_rate=Config.DETECTION_MIN_RATE):
+        self.budget = budget_ms / 1000.0
+        self.max_stride = max_stride
+        self.min_interval = 1.0 / min_rate if min_rate else float("inf")
+        self.stride = 1
+        self.latency = None
+        self.frames = 0
+        self.detections = 0
+        self._frames_since = 0
+        self._last = None
+        self._previous = None
+    
+    def should_detect(self, now):
+        if self._last is None:
+            return True
+        return self._frames_since >= self.stride or now - self._last[0] >= self.min_interval
+    
+    def update(self, now, hands, latency):
+        """Record a fresh detection and adapt the stride to its latency"""
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.stride = max(1, min(self.max_stride, math.ceil(self.latency / self.budget)))
+        self._previous = self._last
+        self._last = (now, hands)
+        self._frames_since = 0
+        self.detections += 1
+    
+    def carry_forward(self, now):
+        """Return the last detected hands, extrapolated to now"""
+        last_time, hands = self._last
+        if self._previous is None or not hands:
+            return hands
+        previous_time, previous_hands = self._previous
+        interval = last_time - previous_time
+        if interval <= 0 or [h['type'] for h in hands] != [h['type'] for h in previous_hands]:
+            return hands
+        
+        # Never extrapolate further ahead than one detection interval
+        t = min(now - last_time, interval) / interval
+        carried = []
+        for hand, previous in zip(hands, previous_hands):
+            dx = int(round((hand['center'][0] - previous['center'][0]) * t))
+            dy = int(round((hand['center'][1] - previous['center'][1]) * t))
+            moved = dict(hand)
+            moved['lmList'] = [[x + dx, y + dy, z] for x, y, z in hand['lmList']]
+            x, y, w, h = hand['bbox']
+            moved['bbox'] = (x + dx, y + dy, w, h)
+            moved['center'] = (hand['center'][0] + dx, hand['center'][1] + dy)
+            carried.append(moved)
+        return carried
+    
+    def next_hands(self, now, detect):
+        """Return hands for this frame, calling detect() only when a detection is due"""
+        self.frames += 1
+        self._frames_since += 1
+        if self.should_detect(now):
+            start = time.perf_counter()
+            hands = detect()
+            self.update(now, hands, time.perf_counter() - start)
+            return hands
+        return self.carry_forward(now)
+
+class IdleGate:
+    """Skip hand detection while nobody is in front of the camera.
+
+    Active: update() is fed whether each processed frame had hands, and after
+    `timeout` seconds without hands the gate goes idle. Idle: watch() is fed a
+    frame at most `idle_fps` times per second and compares a small grayscale
+    copy with the previous one. When at least `threshold` of its pixels changed
+    by more than `pixel_delta` the gate wakes, so detection resumes within
+    1 / idle_fps seconds of motion.
+    """
+    
+    def __init__(self, timeout=Config.IDLE_TIMEOUT, idle_fps=Config.IDLE_FPS, width=Config.IDLE_MOTION_WIDTH,
+                 threshold=Config.IDLE_MOTION_THRESHOLD, pixel_delta=Config.IDLE_PIXEL_DELTA):
+        self.timeout = timeout
+        self.fps = idle_fps
+        self.interval = 1.0 / idle_fps
+        self.width = width
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.active = True
+        self.wakes = 0
+        self.sleeps = 0
+        self.active_time = 0.0
+        self.idle_time = 0.0
+        self._since = None
+        self._last_hands = None
+        self._next_check = 0.0
+        self._small = None
+        self._gray = None
+        self._previous = None
+        self._diff = None
+    
+    def _switch(self, now, active):
+        if self._since is not None:
+            if self.active:
+                self.active_time += now - self._since
+            else:
+                self.idle_time += now - self._since
+        self._since = now
+        self.active = active
+    
+    def update(self, now, hands):
+        """Record an actively processed frame; returns True when the gate goes idle"""
+        if self._since is None:
+            self._since = now
+        if hands or self._last_hands is None:
+            self._last_hands = now
+        if now - self._last_hands < self.timeout:
+            return False
+        self._switch(now, False)
+        self.sleeps += 1
+        self._previous = None
+        self._next_check = now
+        return True
+    
+    def due(self, now):
+        """True when the idle gate wants the next frame"""
+        return now >= self._next_check
+    
+    def watch(self, now, frame):
+        """Compare an idle frame with the previous one; returns True when motion wakes the gate"""
+        self._next_check = now + self.interval
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, h * self.width // w))
+        if self._small is None or self._small.shape[:2] != size[::-1]:
+            self._small = np.empty((size[1], size[0], 3), np.uint8)
+            self._gray = np.empty(size[::-1], np.uint8)
+            self._diff = np.empty(size[::-1], np.uint8)
+            self._previous = None
+        cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if self._previous is None:
+            self._previous = self._gray.copy()
+            return False
+        cv2.absdiff(self._gray, self._previous, dst=self._diff)
+        self._gray, self._previous = self._previous, self._gray
+        cv2.threshold(self._diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self._diff)
+        if cv2.countNonZero(self._diff) < self.threshold * self._diff.size:
+            return False
+        self._switch(now, True)
+        self.wakes += 1
+        # Give the detector the full timeout to find the hands that caused the motion
+        self._last_hands = now
+        return True
+    
+    def duty_cycle(self, now=None):
+        """Fraction of time spent with hand detection active"""
+        active, idle = self.active_time, self.idle_time
+        if now is not None and self._since is not None:
+            if self.active:
+                active += now - self._since
+            else:
+                idle += now - self._since
+        total = active + idle
+        return active / total if total > 0 else 1.0
+
+# ==========================
+# LANDMARK CLASSIFIER
+# ==========================
+
+LANDMARK_WRIST = 0
+LANDMARK_MIDDLE_MCP = 9
+
+def normalize_landmarks(points, mirror=None):
+    """Turn (..., 21, 3) landmarks into (..., 60) feature vectors and return them with each hand's scale.
+
+    The wrist becomes the origin, the hand is rotated so the wrist to middle
+    finger knuckle line points up, and lengths are divided by that distance.
+    Left hands (mirror True) are flipped so both hands share templates.
+    """
+    pts = np.array(points, dtype=np.float32)
+    pts -= pts[..., LANDMARK_WRIST:LANDMARK_WRIST + 1, :]
+    if mirror is not None:
+        pts[..., 0] *= np.where(np.asarray(mirror), -1.0, 1.0)[..., None].astype(np.float32)
+    axis = pts[..., LANDMARK_MIDDLE_MCP, :]
+    length = np.maximum(np.linalg.norm(axis, axis=-1), 1e-6)[..., None]
+    planar = np.maximum(np.hypot(axis[..., 0], axis[..., 1]), 1e-6)
+    vx = (axis[..., 0] / planar)[..., None]
+    vy = (axis[..., 1] / planar)[..., None]
+    x = pts[..., 0].copy()
+    y = pts[..., 1]
+    # Rotate the knuckle direction onto (0, -1), image up
+    pts[..., 0] = -vy * x + vx * y
+    pts[..., 1] = -vx * x - vy * y
+    pts /= length[..., None]
+    return pts[..., 1:, :].reshape(pts.shape[:-2] + (60,)), length[..., 0]
+
+def landmark_features(landmarks, types, centers):
+    """Feature vectors for N frames of one or two hands.
+
+    landmarks is (N, hands, 21, 3), types (N, hands) indices into HAND_TYPES and
+    centers (N, hands, 2). Two hands are ordered right hand first (then by x)
+    and the second wrist's offset from the first is appended.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    types = np.asarray(types)
+    mirror = types == HAND_TYPES.index("Left")
+    if landmarks.shape[1] == 1:
+        return normalize_landmarks(landmarks[:, 0], mirror[:, 0])[0]
+    
+    centers = np.asarray(centers)
+    swap = (mirror[:, 0] & ~mirror[:, 1]) | ((mirror[:, 0] == mirror[:, 1]) & (centers[:, 0, 0] > centers[:, 1, 0]))
+    order = np.where(swap[:, None], [1, 0], [0, 1])
+    rows = np.arange(len(landmarks))[:, None]
+    landmarks = landmarks[rows, order]
+    mirror = mirror[rows, order]
+    features, lengths = normalize_landmarks(landmarks, mirror)
+    offset = (landmarks[:, 1, LANDMARK_WRIST] - landmarks[:, 0, LANDMARK_WRIST]) / lengths[:, :1]
+    return np.concatenate([features[:, 0], features[:, 1], offset], axis=1)
+
+def hand_features(hands):
+    """Feature vector for the cvzone hand dicts of one frame"""
+    landmarks = [[hand['lmList'] for hand in hands[:2]]]
+    types = [[HAND_TYPES.index(hand['type']) if hand['type'] in HAND_TYPES else 0 for hand in hands[:2]]]
+    centers = [[hand['center'] for hand in hands[:2]]]
+    return landmark_features(landmarks, types, centers)[0]
+
+class LandmarkIndex:
+    """Labelled landmark templates matched by k-nearest-neighbour vote, one table per hand count.
+
+    Matching is a single matrix-vector product against all templates, which
+    beats a KD-tree at 60+ dimensions and takes a few microseconds per
+    thousand templates.
+    """
+    
+    POINTS = {1: 20, 2: 40}
+    
+    def __init__(self, k=Config.LANDMARK_K, max_distance=Config.LANDMARK_MAX_DISTANCE):
+        self.k = k
+        self.max_distance = max_distance
+        self.tables = {}
+    
+    def __len__(self):
+        return sum(len(table[0]) for table in self.tables.values())
+    
+    @property
+    def labels(self):
+        return sorted({str(label) for table in self.tables.values() for label in table[3]})
+    
+    def add(self, hand_count, features, labels):
+        """Add templates; labels is one label per row or a single label for all rows"""
+        features = np.asarray(features, dtype=np.float32).reshape(len(features), -1)
+        labels = np.broadcast_to(np.asarray(labels, dtype=str), (len(features),))
+        if hand_count in self.tables:
+            old = self.tables[hand_count]
+            features = np.concatenate([old[0], features])
+            labels = np.concatenate([old[3][old[2]], labels])
+        names, ids = np.unique(labels, return_inverse=True)
+        norms = np.einsum("ij,ij->i", features, features)
+        self.tables[hand_count] = (np.ascontiguousarray(features), norms, ids.astype(np.int32), names)
+        return self
+    
+    def query(self, hand_count, feature):
+        """Return (label, distance) for a feature vector, or (None, distance) if nothing is close.
+
+        distance is the RMS landmark distance to the nearest template in units
+        of wrist to knuckle length.
+        """
+        table = self.tables.get(hand_count)
+        if table is None:
+            return None, float("inf")
+        features, norms, ids, names = table
+        feature = np.asarray(feature, dtype=np.float32)
+        d2 = norms - 2.0 * (features @ feature) + float(feature @ feature)
+        k = min(self.k, len(d2))
+        nearest = np.argpartition(d2, k - 1)[:k] if k < len(d2) else np.arange(len(d2))
+        nearest = nearest[np.argsort(d2[nearest])]
+        distance = math.sqrt(max(float(d2[nearest[0]]), 0.0) / self.POINTS.get(hand_count, 20))
+        if distance > self.max_distance:
+            return None, distance
+        votes = np.bincount(ids[nearest], minlength=len(names))
+        # Ties go to the label with the nearest template
+        winners = np.flatnonzero(votes == votes.max())
+        label = next(ids[i] for i in nearest if ids[i] in winners)
+        return str(names[label]), distance
+    
+    def classify(self, hands):
+        """Return the token for cvzone hand dicts, or None"""
+        if not hands:
+            return None
+        return self.query(min(len(hands), 2), hand_features(hands))[0]
+    
+    def save(self, path):
+        arrays = {}
+        for count, (features, _, ids, names) in self.tables.items():
+            arrays[f"features_{count}"] = features
+            arrays[f"labels_{count}"] = names[ids]
+        np.savez_compressed(path, **arrays)
+    
+    @classmethod
+    def load(cls, path, **kwargs):
+        index = cls(**kwargs)
+        with np.load(path, allow_pickle=False) as data:
+            for count in (1, 2):
+                if f"features_{count}" in data:
+                    index.add(count, data[f"features_{count}"], data[f"labels_{count}"])
+        return index
+
+def load_landmark_index(path=None):
+    """Load the configured landmark index, or return None if there is none"""
+    path = path or Config.LANDMARK_INDEX_PATH
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        index = LandmarkIndex.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[WARNING] Ignoring landmark index {path}: {e}")
+        return None
+    print(f"[INFO] Loaded {len(index)} landmark templates for {len(index.labels)} tokens from {path}")
+    return index
+
+def build_landmark_index(specs, out, stride=1):
+    """Build a landmark index from LABEL=SESSION_DIR pairs of recorded samples.
+
+    Each session should show one token. Frames with the session's most common
+    hand count are used, every stride-th one.
+    """
+    index = LandmarkIndex()
+    for spec in specs:
+        label, sep, directory = spec.partition("=")
+        if not sep or not label:
+            raise ValueError(f"Expected LABEL=SESSION_DIR, got {spec}")
+        records = ReplaySession(directory).records
+        counts = np.bincount(records["count"], minlength=3)[1:3]
+        if not counts.any():
+            print(f"[WARNING] {directory} has no frames with hands")
+            continue
+        hand_count = int(np.argmax(counts)) + 1
+        samples = records[records["count"] == hand_count][::stride]
+        features = landmark_features(samples["landmarks"][:, :hand_count], samples["type"][:, :hand_count],
+                                     samples["center"][:, :hand_count])
+        index.add(hand_count, features, label)
+        print(f"[INFO] {label}: {len(samples)} {hand_count}-hand samples from {directory}")
+    if not len(index):
+        raise ValueError("No samples found")
+    index.save(out)
+    
+    # Time queries against the finished index with its own templates
+    for count, (features, _, _, _) in index.tables.items():
+        probes = features[np.random.default_rng(0).integers(0, len(features), 200)]
+        start = time.perf_counter()
+        for feature in probes:
+            index.query(count, feature)
+        per_query = (time.perf_counter() - start) / len(probes) * 1e6
+        print(f"[INFO] {count}-hand table: {len(features)} templates, {per_query:.0f} us per query")
+    print(f"[SUCCESS] Saved {len(index)} templates for {len(index.labels)} tokens to {out}")
+    return index
+
+# ==========================
+# GESTURE RECOGNITION
+# ==========================
+
+RecognizerEvent = namedtuple("RecognizerEvent", ["kind", "token", "progress"])
+
+class GestureRecognizer:
+    """Confirm tokens from per-frame observations with a sliding-window majority vote.
+
+    Feed update(timestamp, token) once per frame, with token None when nothing
+    was recognized. The last `window` observations (no older than
+    `window_seconds`) vote; a token that wins at least `confidence` of the votes
+    becomes the candidate, and is confirmed once it has been held for
+    `first_hold` seconds (first token after a reset) or `hold` seconds, on a
+    frame that still shows it. A single flickered frame does not restart the
+    hold, and the window is cleared on every confirmation so each token needs
+    its own hold.
+    """
+    
+    IDLE = "idle"
+    PROGRESS = "progress"
+    CONFIRM = "confirm"
+    
+    def __init__(self, first_hold=Config.FIRST_LETTER_DELAY, hold=Config.LETTER_DETECTION_DELAY,
+                 window=Config.RECOGNIZER_WINDOW, window_seconds=Config.RECOGNIZER_WINDOW_SECONDS,
+                 confidence=Config.RECOGNIZER_CONFIDENCE):
+        self.first_hold = first_hold
+        self.hold = hold
+        self.window_seconds = window_seconds
+        self.confidence = confidence
+        self._times = [0.0] * window
+        self._tokens = [None] * window
+        self._votes = {}
+        self._start = 0
+        self._count = 0
+        self.first = True
+        self.candidate = None
+        self.candidate_since = None
+    
+    @property
+    def current_hold(self):
+        return self.first_hold if self.first else self.hold
+    
+    def reset(self, first=True):
+        """Forget all observations, optionally requiring the longer first hold again"""
+        self._votes.clear()
+        self._start = 0
+        self._count = 0
+        self.candidate = None
+        self.candidate_since = None
+        if first:
+            self.first = True
+    
+    def _evict(self):
+        token = self._tokens[self._start]
+        self._tokens[self._start] = None
+        self._votes[token] -= 1
+        if not self._votes[token]:
+            del self._votes[token]
+        self._start = (self._start + 1) % len(self._tokens)
+        self._count -= 1
+    
+    def _push(self, timestamp, token):
+        if self._count == len(self._tokens):
+            self._evict()
+        slot = (self._start + self._count) % len(self._tokens)
+        self._times[slot] = timestamp
+        self._tokens[slot] = token
+        self._votes[token] = self._votes.get(token, 0) + 1
+        self._count += 1
+    
+    def _first_seen(self, token):
+        size = len(self._tokens)
+        for i in range(self._count):
+            slot = (self._start + i) % size
+            if self._tokens[slot] == token:
+                return self._times[slot]
+        return None
+    
+    def update(self, timestamp, token):
+        """Add one observation and return a RecognizerEvent"""
+        self._push(timestamp, token)
+        while self._count > 1 and self._times[self._start] < timestamp - self.window_seconds:
+            self._evict()
+        
+        leader, votes = None, 0
+        for candidate, count in self._votes.items():
+            if candidate is not None and count > votes:
+                leader, votes = candidate, count
+        
+        if leader is None or votes < self.confidence * self._count:
+            self.candidate = None
+            self.candidate_since = None
+            return RecognizerEvent(self.IDLE, None, 0.0)
+        
+        if leader != self.candidate:
+            # The hold starts when the gesture first showed up, not when it won the vote
+            self.candidate = leader
+            self.candidate_since = self._first_seen(leader)
+        
+        hold = self.current_hold
+        held = timestamp - self.candidate_since
+        # The old token may still lead the window just after the hand changed
+        if held >= hold and token == leader:
+            self.reset(first=False)
+            self.first = False
+            return RecognizerEvent(self.CONFIRM, leader, 1.0)
+        return RecognizerEvent(self.PROGRESS, leader, held / hold)
+
+FrameResult = namedtuple("FrameResult", ["hands", "pattern", "token", "event", "first"])
+
+class GesturePipeline:
+    """Hand detection, pattern matching and confirmation for one stream, with no drawing"""
+    
+    # Event kind for confirmed command gestures, which add no text
+    COMMAND = "command"
+    
+    def __init__(self, detector, vocabularies=None, recognizer=None, scheduler=None,
+                 inference_scale=None, timer=None, landmark_index=False, context=None, commands=True):
+        self.detector = detector
+        # Without a UI that acts on them, command gestures such as [ACCEPT] are not recognized at all
+        self.commands = commands
+        # Reused image buffers; the frame loop reads and mirrors through the same context
+        self.context = context if context is not None else FrameContext()
+        self.timer = timer if timer is not None else NULL_TIMER
+        self.vocabularies = vocabularies if vocabularies is not None else VocabularyWatcher()
+        # False loads the configured index if there is one; None disables landmark matching
+        self.landmark_index = load_landmark_index() if landmark_index is False else landmark_index
+        self.recognizer = recognizer if recognizer is not None else GestureRecognizer()
+        if scheduler is None:
+            scheduler = DetectionScheduler() if Config.DETECTION_ADAPTIVE else DetectionScheduler(max_stride=1)
+        self.scheduler = scheduler
+        self.inference_scale = Config.INFERENCE_SCALE if inference_scale is None else inference_scale
+        self.detected_letters = []
+        self.detected_sentence = ""
+        # Called with each word or phrase as soon as it is complete, e.g. StreamingSpeech.push
+        self.on_chunk = None
+        # EventBus for progress, token, complete, space, clear and speak events; name tags them
+        self.events = None
+        self.name = None
+        self._progress = None
+    
+    def publish(self, kind, **data):
+        if self.events is not None:
+            if self.name is not None:
+                data["session"] = self.name
+            self.events.publish(kind, **data)
+    
+    def _publish_progress(self, event):
+        # Only changes of candidate or of a 10% step are published, not every frame
+        state = (event.token, int(event.progress * 10)) if event.kind == GestureRecognizer.PROGRESS else None
+        if state != self._progress:
+            self._progress = state
+            self.publish("progress", token=event.token if state else None,
+                         progress=round(event.progress, 2) if state else 0.0)
+    
+    def _close_word(self):
+        spelled = self.partial_word()
+        if spelled and self.on_chunk is not None:
+            self.on_chunk(spelled)
+    
+    def process(self, frame, timestamp):
+        """Run one mirrored frame through the pipeline and return a FrameResult"""
+        hands = self.scheduler.next_hands(
+            timestamp, lambda: find_hands(self.detector, frame, self.inference_scale, draw=False,
+                                          context=self.context))
+        self.timer.lap("findHands")
+        return self.process_hands(hands, timestamp)
+    
+    def process_hands(self, hands, timestamp):
+        """Match and confirm hands that were detected elsewhere and return a FrameResult"""
+        token = None
+        pattern = NO_PATTERN
+        vocabulary = self.vocabularies.poll()
+        if hands:
+            pattern, token = vocabulary.classify(add_fingers(self.detector, hands))
+            if self.landmark_index is not None:
+                # Landmark templates win; finger patterns cover tokens the index does not know
+                token = self.landmark_index.classify(hands) or token
+            if not self.commands and token in COMMAND_PATTERNS.values():
+                token = None
+        self.timer.lap("fingersUp")
+        
+        first = self.recognizer.first
+        event = self.recognizer.update(timestamp, token)
+        if self.events is not None:
+            self._publish_progress(event)
+        if event.kind == GestureRecognizer.CONFIRM:
+            if event.token in COMMAND_PATTERNS.values():
+                event = event._replace(kind=self.COMMAND)
+            else:
+                spelled = len(event.token) == 1 and event.token.isalpha()
+                if not spelled:
+                    self._close_word()
+                self.detected_letters.append(event.token)
+                self.detected_sentence += event.token + " "
+                self.publish("token", token=event.token, first=first)
+                if not spelled and self.on_chunk is not None:
+                    self.on_chunk(event.token)
+        self.timer.lap("recognize")
+        return FrameResult(hands, pattern, token, event, first)
+    
+    def add_space(self):
+        self._close_word()
+        self.detected_sentence += " "
+        self.detected_letters.append(" ")
+        self.publish("space")
+    
+    def clear(self):
+        self.detected_sentence = ""
+        self.detected_letters.clear()
+        self.recognizer.reset()
+        self.publish("clear")
+    
+    def speak(self, worker=None):
+        """Speak the sentence so far"""
+        self.publish("speak", text=" ".join(self.detected_letters))
+        speak_detected_letters(self.detected_letters, worker)
+    
+    def partial_word(self):
+        """Return the letters spelled since the last space or word"""
+        count = 0
+        for token in reversed(self.detected_letters):
+            if len(token) != 1 or not token.isalpha():
+                break
+            count += 1
+        return "".join(self.detected_letters[len(self.detected_letters) - count:])
+    
+    def complete_word(self, word):
+        """Replace the spelled letters of the current word with word"""
+        prefix = self.partial_word()
+        if prefix:
+            del self.detected_letters[-len(prefix):]
+            spelled = "".join(letter + " " for letter in prefix)
+            if self.detected_sentence.endswith(spelled):
+                self.detected_sentence = self.detected_sentence[:-len(spelled)]
+        self.detected_letters.append(word)
+        self.detected_sentence += word + " "
+        self.publish("complete", token=word, replaces=prefix)
+        if self.on_chunk is not None:
+            self.on_chunk(word)
+
+# ==========================
+# WORD COMPLETION
+# ==========================
+
+TRIE_MAGIC = b"HAVITRIE"
+TRIE_VERSION = 1
+TRIE_HEADER = np.dtype([("magic", "S8"), ("version", "<u4"), ("k", "<u4"),
+                        ("nodes", "<u4"), ("words", "<u4"), ("blob", "<u4")])
+TRIE_NO_WORD = 0xFFFFFFFF
+
+def trie_node_dtype(k):
+    return np.dtype([("char", "<u2"), ("children", "<u2"), ("first", "<u4"), ("top", "<u4", (k,))])
+
+def load_lexicon(path):
+    """Return the words of a lexicon file, most frequent first"""
+    ranked = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            count = float(parts[1]) if len(parts) > 1 else None
+            ranked.append((parts[0].upper(), count))
+    if any(count is not None for _, count in ranked):
+        # Words without a count keep file order behind the counted ones
+        ranked.sort(key=lambda item: -(item[1] or 0))
+    return list(dict.fromkeys(word for word, _ in ranked))
+
+def build_word_trie(words, path, k=Config.COMPLETION_COUNT):
+    """Write a prefix trie of words (most frequent first) to path.
+
+    Nodes are stored breadth first so each node's children are contiguous and
+    sorted by character. Every node keeps the ids of the k + 1 most frequent
+    words below it, so a lookup never has to search the subtree; one extra id
+    leaves room to drop the prefix itself.
+    """
+    top_count = k + 1
+    root = {}
+    tops = {id(root): []}
+    for word_id, word in enumerate(words):
+        node = root
+        for char in word:
+            if len(tops[id(node)]) < top_count:
+                tops[id(node)].append(word_id)
+            node = node.setdefault(char, {})
+            tops.setdefault(id(node), [])
+        if len(tops[id(node)]) < top_count:
+            tops[id(node)].append(word_id)
+    
+    order = [("", root)]
+    nodes = []
+    i = 0
+    while i < len(order):
+        char, node = order[i]
+        nodes.append((ord(char) if char else 0, len(node), len(order) if node else 0,
+                      tops[id(node)] + [TRIE_NO_WORD] * (top_count - len(tops[id(node)]))))
+        order.extend(sorted(node.items()))
+        i += 1
+    
+    encoded = [word.encode("utf-8") for word in words]
+    offsets = np.zeros(len(words) + 1, "<u4")
+    offsets[1:] = np.cumsum([len(word) for word in encoded])
+    header = np.array([(TRIE_MAGIC, TRIE_VERSION, top_count, len(nodes), len(words), int(offsets[-1]))],
+                      TRIE_HEADER)
+    table = np.array(nodes, trie_node_dtype(top_count))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header.tobytes())
+        f.write(table.tobytes())
+        f.write(offsets.tobytes())
+        f.write(b"".join(encoded))
+    os.replace(tmp, path)
+
+class WordCompleter:
+    """Top-k completions from a memory-mapped prefix trie built by build_word_trie"""
+    
+    def __init__(self, path, k=Config.COMPLETION_COUNT):
+        self.k = k
+        data = np.memmap(path, np.uint8, mode="r")
+        header = data[:TRIE_HEADER.itemsize].view(TRIE_HEADER)[0]
+        if header["magic"] != TRIE_MAGIC or header["version"] != TRIE_VERSION:
+            raise ValueError(f"{path} is not a HAVI word trie")
+        if header["k"] < k + 1:
+            raise ValueError(f"{path} keeps {header['k'] - 1} completions per prefix, {k} requested")
+        dtype = trie_node_dtype(int(header["k"]))
+        start = TRIE_HEADER.itemsize
+        end = start + int(header["nodes"]) * dtype.itemsize
+        self.nodes = data[start:end].view(dtype)
+        self._chars = self.nodes["char"]
+        start, end = end, end + (int(header["words"]) + 1) * 4
+        self.offsets = data[start:end].view("<u4")
+        self.blob = data[end:end + int(header["blob"])]
+        self.word_count = int(header["words"])
+        self._last = (None, [])
+    
+    def word(self, word_id):
+        return bytes(self.blob[self.offsets[word_id]:self.offsets[word_id + 1]]).decode("utf-8")
+    
+    def find(self, prefix):
+        """Return the node index for prefix, or -1"""
+        node = 0
+        for char in prefix:
+            first = int(self.nodes[node]["first"])
+            count = int(self.nodes[node]["children"])
+            code = ord(char)
+            i = first + int(np.searchsorted(self._chars[first:first + count], code))
+            if i >= first + count or self._chars[i] != code:
+                return -1
+            node = i
+        return node
+    
+    def complete(self, prefix):
+        """Return up to k most frequent words that start with prefix and are longer than it"""
+        prefix = prefix.upper()
+        if prefix == self._last[0]:
+            return self._last[1]
+        words = []
+        node = self.find(prefix) if len(prefix) >= Config.COMPLETION_MIN_PREFIX else -1
+        if node >= 0:
+            for word_id in self.nodes[node]["top"]:
+                if word_id == TRIE_NO_WORD:
+                    break
+                word = self.word(int(word_id))
+                if word != prefix:
+                    words.append(word)
+        words = words[:self.k]
+        self._last = (prefix, words)
+        return words
+
+def load_word_completer(lexicon_path=None, trie_path=None):
+    """Open the trie for the lexicon, rebuilding it when the lexicon changed; None if unavailable"""
+    lexicon_path = lexicon_path or Config.LEXICON_PATH
+    trie_path = trie_path or Config.LEXICON_TRIE_PATH
+    try:
+        if not os.path.exists(trie_path) or os.path.getmtime(trie_path) < os.path.getmtime(lexicon_path):
+            words = load_lexicon(lexicon_path)
+            build_word_trie(words, trie_path)
+            print(f"[INFO] Built word completion trie with {len(words)} words")
+        try:
+            return WordCompleter(trie_path)
+        except ValueError:
+            build_word_trie(load_lexicon(lexicon_path), trie_path)
+            return WordCompleter(trie_path)
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Word completion unavailable: {e}")
+        return None
+
+# ==========================
+# EVENT STREAM
+# ==========================
+
+EVENT_TYPES = ("progress", "token", "complete", "space", "clear", "speak")
+EVENT_POLICIES = ("drop", "drop_oldest", "block")
+
+HaviEvent = namedtuple("HaviEvent", ["seq", "timestamp", "type", "data"])
+
+def event_json(event):
+    record = {"seq": event.seq, "time": round(event.timestamp, 6), "type": event.type}
+    record.update(event.data)
+    return json.dumps(record, ensure_ascii=False)
+
+class EventSink(abc.ABC):
+    """Base class for event consumers with a bounded queue drained by a writer thread.
+
+    offer() never waits longer than block_timeout: with the "drop" policy a
+    full queue rejects the new event, with "drop_oldest" it discards the oldest
+    queued one, and with "block" it waits up to block_timeout for room before
+    dropping. The writer thread hands write_batch() up to batch_size events at
+    a time, waiting at most flush_interval to fill a batch.
+    """
+    
+    def __init__(self, policy=Config.EVENT_POLICY, maxsize=Config.EVENT_QUEUE_SIZE,
+                 batch_size=Config.EVENT_BATCH_SIZE, flush_interval=Config.EVENT_FLUSH_INTERVAL,
+                 block_timeout=Config.EVENT_BLOCK_TIMEOUT):
+        if policy not in EVENT_POLICIES:
+            raise ValueError(f"Unknown event policy '{policy}', expected one of {', '.join(EVENT_POLICIES)}")
+        self.policy = policy
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self.written = 0
+        self._events = []
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"havi-events-{type(self).__name__}", daemon=True)
+        self._thread.start()
+    
+    def offer(self, event):
+        with self._cond:
+            if len(self._events) >= self.maxsize and self.policy == "block":
+                self._cond.wait_for(lambda: len(self._events) < self.maxsize, self.block_timeout)
+            if len(self._events) >= self.maxsize:
+                if self.policy == "drop_oldest":
+                    self._events.pop(0)
+                else:
+                    self.dropped += 1
+                    return False
+                self.dropped += 1
+            self._events.append(event)
+            if len(self._events) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._events) >= self.batch_size or not self._running,
+                                    self.flush_interval)
+                batch = self._events[:self.batch_size]
+                del self._events[:self.batch_size]
+                running = self._running or bool(self._events)
+                self._cond.notify_all()
+            if batch:
+                try:
+                    self.write_batch(batch)
+                    self.written += len(batch)
+                except Exception as e:
+                    self.dropped += len(batch)
+                    print(f"[WARNING] {type(self).__name__} failed to write events: {e}")
+            if not running:
+                break
+        self.close_sink()
+    
+    @abc.abstractmethod
+    def write_batch(self, events):
+        """Deliver a list of HaviEvents to the consumer"""
+    
+    def close_sink(self):
+        pass
+    
+    def close(self, timeout=1.0):
+        """Write out what is queued and stop the writer thread"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+
+class CallbackSink(EventSink):
+    """Call a function with each event on the sink's own thread"""
+    
+    def __init__(self, callback, **kwargs):
+        self.callback = callback
+        super().__init__(**kwargs)
+    
+    def write_batch(self, events):
+        for event in events:
+            self.callback(event)
+
+class JsonLinesSink(EventSink):
+    """Append events to a file, one JSON object per line"""
+    
+    def __init__(self, path, **kwargs):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        super().__init__(**kwargs)
+    
+    def write_batch(self, events):
+        self._file.write("".join(event_json(event) + "\n" for event in events))
+        self._file.flush()
+    
+    def close_sink(self):
+        self._file.close()
+
+class SocketSink(EventSink):
+    """Serve events as JSON lines to every client of a local Unix or TCP socket.
+
+    address is "unix:/path/to/socket" or "tcp:HOST:PORT". A client that does not
+    take a batch within send_timeout seconds is disconnected.
+    """
+    
+    def __init__(self, address, send_timeout=1.0, **kwargs):
+        import socket
+        import stat
+        kind, _, target = address.partition(":")
+        if kind == "unix":
+            if os.path.exists(target):
+                # Replace a stale socket from an earlier run, but never any other kind of file
+                if not stat.S_ISSOCK(os.stat(target).st_mode):
+                    raise ValueError(f"{target} exists and is not a socket")
+                os.unlink(target)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(target)
+        elif kind == "tcp":
+            host, _, port = target.rpartition(":")
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._server.bind((host or "127.0.0.1", int(port)))
+        else:
+            raise ValueError(f"Socket address must start with unix: or tcp:, got {address}")
+        self.address = address
+        self.send_timeout = send_timeout
+        self._server.listen()
+        self._server.settimeout(0.2)
+        self._clients = []
+        self._clients_lock = threading.Lock()
+        self._accepting = True
+        self._acceptor = threading.Thread(target=self._accept, name="havi-events-accept", daemon=True)
+        self._acceptor.start()
+        super().__init__(**kwargs)
+    
+    def _accept(self):
+        while self._accepting:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                continue
+            client.settimeout(self.send_timeout)
+            with self._clients_lock:
+                self._clients.append(client)
+    
+    def write_batch(self, events):
+        data = "".join(event_json(event) + "\n" for event in events).encode("utf-8")
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.sendall(data)
+            except OSError:
+                with self._clients_lock:
+                    self._clients.remove(client)
+                client.close()
+    
+    def close_sink(self):
+        self._accepting = False
+        self._acceptor.join(timeout=1.0)
+        with self._clients_lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+        self._server.close()
+        if self.address.startswith("unix:") and os.path.exists(self.address[5:]):
+            os.unlink(self.address[5:])
+
+def create_event_sink(spec, policy=Config.EVENT_POLICY):
+    """Create a sink from jsonl:PATH, unix:PATH or tcp:HOST:PORT"""
+    kind, _, target = spec.partition(":")
+    if kind == "jsonl":
+        return JsonLinesSink(target, policy=policy)
+    if kind in ("unix", "tcp"):
+        return SocketSink(spec, policy=policy)
+    raise ValueError(f"Unknown event sink '{spec}', expected jsonl:PATH, unix:PATH or tcp:HOST:PORT")
+
+class EventBus:
+    """Number events and offer them to every sink without waiting on slow consumers"""
+    
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+    
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+    
+    def publish(self, kind, **data):
+        with self._lock:
+            # Sequence numbers follow the order events reach the sinks
+            event = HaviEvent(next(self._seq), time.time(), kind, data)
+            for sink in self.sinks:
+                sink.offer(event)
+        return event
+    
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        for sink in self.sinks:
+            if sink.dropped:
+                print(f"[WARNING] {type(sink).__name__} dropped {sink.dropped} events")
+
+def create_event_bus(specs=None, policy=None):
+    """Create an EventBus for the configured sinks, or None when there are none"""
+    specs = Config.EVENT_SINKS if specs is None else specs
+    if not specs:
+        return None
+    bus = EventBus()
+    for spec in specs:
+        try:
+            bus.add_sink(create_event_sink(spec, policy or Config.EVENT_POLICY))
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Cannot open event sink {spec}: {e}")
+            continue
+        print(f"[INFO] Publishing events to {spec}")
+    return bus
+
+# ==========================
+# RECORD AND REPLAY
+# ==========================
+
+HAND_TYPES = ("Left", "Right")
+
+HAND_RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("count", "u1"),
+    ("type", "u1", (2,)),
+    ("fingers", "u1", (2, 5)),
+    ("center", "<i4", (2, 2)),
+    ("bbox", "<i4", (2, 4)),
+    ("landmarks", "<i4", (2, 21, 3)),
+])
+
+def pack_hand_record(record, timestamp, hands):
+    """Fill a HAND_RECORD_DTYPE record from cvzone hand dicts (fingers must be set)"""
+    record.fill(0)
+    record["timestamp"] = timestamp
+    record["count"] = min(len(hands), 2)
+    for i, hand in enumerate(hands[:2]):
+        record["type"][i] = HAND_TYPES.index(hand["type"]) if hand["type"] in HAND_TYPES else 0
+        record["fingers"][i] = hand["fingers"]
+        record["center"][i] = hand["center"]
+        record["bbox"][i] = hand["bbox"]
+        record["landmarks"][i] = hand["lmList"]
+    return record
+
+def unpack_hand_record(record, sx=1.0, sy=1.0):
+    """Return cvzone-style hand dicts from a HAND_RECORD_DTYPE record, optionally rescaled"""
+    hands = []
+    for i in range(int(record["count"])):
+        hand = {
+            'lmList': record["landmarks"][i].tolist(),
+            'bbox': tuple(record["bbox"][i].tolist()),
+            'center': tuple(record["center"][i].tolist()),
+            'type': HAND_TYPES[record["type"][i]],
+            'fingers': record["fingers"][i].tolist(),
+        }
+        if sx != 1.0 or sy != 1.0:
+            scale_hand(hand, sx, sy)
+        hands.append(hand)
+    return hands
+
+class SessionRecorder:
+    """Record raw camera frames and per-frame hand results to a session directory.
+
+    The directory holds frames.mp4, hands.bin (fixed-size HAND_RECORD_DTYPE
+    records, memory-mapped on replay), meta.json and transcript.txt with the
+    recognized tokens, which can be corrected by hand to serve as ground truth.
+    """
+    
+    def __init__(self, directory, fps=30.0, video=True):
+        self.directory = directory
+        self.fps = fps
+        self.video = video
+        self.frames = 0
+        self.tokens = []
+        self._size = None
+        self._writer = None
+        self._record = np.zeros(1, HAND_RECORD_DTYPE)
+        os.makedirs(directory, exist_ok=True)
+        self._hands_file = open(os.path.join(directory, "hands.bin"), "wb")
+    
+    def write(self, frame, timestamp, hands, token=None):
+        """Append one raw frame, its hand results and an optionally confirmed token"""
+        if self._size is None:
+            self._size = (frame.shape[1], frame.shape[0])
+            if self.video:
+                self._writer = cv2.VideoWriter(os.path.join(self.directory, "frames.mp4"),
+                                               cv2.VideoWriter_fourcc(*"mp4v"), self.fps, self._size)
+        if self._writer is not None:
+            self._writer.write(frame)
+        
+        pack_hand_record(self._record[0], timestamp, hands)
+        self._record.tofile(self._hands_file)
+        
+        if token is not None:
+            self.tokens.append(token)
+        self.frames += 1
+    
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+        self._hands_file.close()
+        width, height = self._size if self._size else (0, 0)
+        with open(os.path.join(self.directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "fps": self.fps, "width": width, "height": height,
+                       "frames": self.frames}, f, indent=2)
+        with open(os.path.join(self.directory, "transcript.txt"), "w", encoding="utf-8") as f:
+            f.writelines(token + "\n" for token in self.tokens if token.strip())
+
+class ReplaySession:
+    """A recorded session whose frames and hand results can stand in for the camera and detector"""
+    
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.width = self.meta["width"]
+        self.height = self.meta["height"]
+        self.fps = self.meta["fps"]
+        self.records = np.memmap(os.path.join(directory, "hands.bin"), dtype=HAND_RECORD_DTYPE, mode="r")
+        self.video_path = os.path.join(directory, "frames.mp4")
+        self.position = -1
+    
+    def __len__(self):
+        return len(self.records)
+    
+    @property
+    def duration(self):
+        if len(self.records) < 2:
+            return 0.0
+        return float(self.records["timestamp"][-1] - self.records["timestamp"][0])
+    
+    def transcript(self):
+        """Return the ground-truth tokens, one per line of transcript.txt"""
+        path = os.path.join(self.directory, "transcript.txt")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    
+    def timestamp(self, index=None):
+        return float(self.records["timestamp"][self.position if index is None else index])
+    
+    def hands_at(self, index, width=None, height=None):
+        """Return cvzone-style hand dicts for a frame, scaled to width x height"""
+        sx = (width or self.width) / self.width
+        sy = (height or self.height) / self.height
+        return unpack_hand_record(self.records[index], sx, sy)
+    
+    def capture(self, video=True):
+        return ReplayCapture(self, video and os.path.exists(self.video_path))
+    
+    def detector(self):
+        return ReplayDetector(self)
+
+class ReplayCapture:
+    """cv2.VideoCapture replacement that plays back a recorded session"""
+    
+    def __init__(self, session, video=True):
+        self.session = session
+        self._cap = cv2.VideoCapture(session.video_path) if video else None
+        self._blank = None
+        session.position = -1
+    
+    def isOpened(self):
+        return self._cap is None or self._cap.isOpened()
+    
+    def read(self, image=None):
+        if self.session.position + 1 >= len(self.session):
+            return False, None
+        if self._cap is not None:
+            success, frame = self._cap.read(image) if image is not None else self._cap.read()
+            if not success:
+                return False, None
+        else:
+            if self._blank is None:
+                self._blank = np.zeros((self.session.height, self.session.width, 3), np.uint8)
+            frame = self._blank
+        self.session.position += 1
+        return True, frame
+    
+    def timestamp(self):
+        """Recorded timestamp of the last frame read"""
+        return self.session.timestamp()
+    
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.session.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.session.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.session.fps)
+        return 0.0
+    
+    def set(self, prop, value):
+        return False
+    
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+
+class ReplayDetector:
+    """HandDetector replacement that returns recorded hand results.
+
+    Follows the frame position of the session's ReplayCapture when one is in
+    use, otherwise advances one frame per findHands call.
+    """
+    
+    def __init__(self, session):
+        self.session = session
+        self._own_position = -1
+    
+    def findHands(self, img, draw=True, flipType=True):
+        if self.session.position >= 0:
+            index = self.session.position
+        else:
+            self._own_position += 1
+            index = self._own_position
+        if index >= len(self.session):
+            return [], img
+        h, w = img.shape[:2]
+        hands = self.session.hands_at(index, w, h)
+        if draw:
+            draw_hands(img, hands)
+        return hands, img
+    
+    def fingersUp(self, hand):
+        return list(hand['fingers'])
+
+# ==========================
+# STARTUP
+# ==========================
+
+class Startup:
+    """Run slow initialization steps concurrently and report the time to first frame"""
+    
+    def __init__(self, started=STARTUP_STARTED):
+        from concurrent.futures import ThreadPoolExecutor
+        self.started = started
+        self.durations = {"launch": time.perf_counter() - started}
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="havi-startup")
+        self._futures = {}
+    
+    def submit(self, name, fn, *args):
+        def timed():
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.durations[name] = time.perf_counter() - start
+        self._futures[name] = self._pool.submit(timed)
+    
+    def wait(self, text="Initializing system"):
+        """Show the loading spinner until every submitted step has finished"""
+        loading_animation(text, wait=list(self._futures.values()))
+        self._pool.shutdown(wait=False)
+    
+    def result(self, name):
+        """Return a step's result, re-raising its exception"""
+        return self._futures[name].result()
+    
+    def first_frame(self):
+        """Report the time from launch to the first displayed frame"""
+        total = time.perf_counter() - self.started
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.durations.items())
+        print(f"[INFO] Time to first frame: {total:.2f}s ({stages})")
+        if Config.STARTUP_LOG_PATH:
+            entry = {"time": time.time(), "first_frame": round(total, 4),
+                     "stages": {name: round(seconds, 4) for name, seconds in self.durations.items()}}
+            try:
+                with open(Config.STARTUP_LOG_PATH, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"[WARNING] Cannot write startup log: {e}")
+        return total
+
+# ==========================
+# MAIN APPLICATION
+# ==========================
+
+def main(record_dir=None):
+    """Main application loop"""
+    print("\n" + "="*60)
+    print("  HAVI - Hand AI Voice Interface")
+    print("="*60 + "\n")
+    
+    startup = Startup()
+    startup.submit("audio", play_intro)
+    startup.submit("camera", initialize_camera)
+    startup.submit("detector", create_hand_detector)
+    startup.submit("lexicon", load_word_completer)
+    startup.wait("Initializing system")
+    
+    speech = SpeechWorker()
+    threading.Thread(target=warm_speech_cache, args=(list(HAND_PATTERNS.values()),),
+                     name="havi-tts-warmup", daemon=True).start()
+    
+    try:
+        cap = startup.result("camera")
+    except Exception as e:
+        print(f"[FATAL] Cannot proceed without camera: {e}")
+        return
+    
+    if Config.CAPTURE_THREADED:
+        cap = FrameGrabber(cap).start()
+    
+    window_name = "HAVI (Hand AI Voice Interface)"
+    try:
+        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(window_name, Config.CAMERA_WIDTH, Config.CAMERA_HEIGHT)
+    except Exception as e:
+        print(f"[ERROR] Cannot create window: {e}")
+        cap.release()
+        return
+    
+    detector = startup.result("detector")
+    completer = startup.result("lexicon")
+    timer = StageTimer(export_path=Config.PROFILE_EXPORT_PATH) if Config.PROFILE_ENABLED else NULL_TIMER
+    pipeline = GesturePipeline(detector, timer=timer)
+    pipeline.events = create_event_bus()
+    context = pipeline.context
+    stream = None
+    if Config.SPEECH_STREAMING:
+        stream = StreamingSpeech()
+        pipeline.on_chunk = stream.push
+    
+    recorder = None
+    if record_dir:
+        recorder = SessionRecorder(record_dir, fps=cap.get(cv2.CAP_PROP_FPS) or 30.0)
+        print(f"[INFO] Recording session to {record_dir}")
+    
+    resolution = None
+    if Config.ADAPTIVE_RESOLUTION:
+        # A recording keeps one frame size, so only the inference scale may change
+        levels = resolution_levels(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                   pipeline.inference_scale, capture=recorder is None)
+        resolution = ResolutionController(levels, camera_delivered_fps(cap))
+    
+    idle = IdleGate() if Config.IDLE_ENABLED else None
+    idle_result = FrameResult([], NO_PATTERN, None, RecognizerEvent(GestureRecognizer.IDLE, None, 0.0), True)
+    
+    def handle_key(key, suggestions):
+        """Apply a keyboard shortcut; returns False when the application should exit"""
+        if key == ord('q'):
+            print("\n[INFO] Exiting application...")
+            return False
+        elif key == ord(' '):
+            pipeline.add_space()
+            print("[ACTION] Space added")
+        elif key == ord('c'):
+            pipeline.clear()
+            speech.interrupt()
+            if stream is not None:
+                stream.interrupt()
+            print("[ACTION] Sentence cleared")
+        elif key == ord('s'):
+            if stream is not None:
+                stream.interrupt()
+            pipeline.speak(speech)
+        elif ord('1') <= key < ord('1') + len(suggestions):
+            word = suggestions[key - ord('1')]
+            print(f"[ACTION] Completed {pipeline.partial_word()} -> {word}")
+            pipeline.complete_word(word)
+        return True
+    
+    print("\n[READY] System initialized. Starting gesture recognition...")
+    print("[INFO] Show a gesture and hold for 2.5 seconds for first detection")
+    print("[INFO] Subsequent detections require 1.5 seconds\n")
+    
+    try:
+        while True:
+            if idle is not None and not idle.active and not isinstance(cap, FrameGrabber) \
+                    and not idle.due(time.monotonic()):
+                # Pull frames off the camera without decoding them until the gate wants one
+                if not cap.grab():
+                    print("[ERROR] Failed to read frame from camera")
+                    break
+                key = cv2.waitKey(1) & 0xFF
+                if key != 0xFF:
+                    suggestions = completer.complete(pipeline.partial_word()) if completer is not None else []
+                    if not handle_key(key, suggestions):
+                        break
+                continue
+            timer.begin_frame()
+            success, frame = context.read(cap)
+            timer.lap("cap.read")
+            if not success:
+                print("[ERROR] Failed to read frame from camera")
+                break
+            
+            frame_start = time.perf_counter()
+            raw_frame = frame
+            frame = context.mirror(frame)
+            timer.lap("flip")
+            timestamp = time.monotonic()
+            if idle is None or idle.active:
+                result = pipeline.process(frame, timestamp)
+                if idle is not None and idle.update(timestamp, result.hands):
+                    print(f"[INFO] No hands for {idle.timeout:.0f}s, entering low-power idle mode")
+                    if isinstance(cap, FrameGrabber):
+                        cap.set_rate(idle.fps)
+            elif idle.watch(timestamp, frame):
+                print("[INFO] Motion detected, resuming hand detection")
+                if isinstance(cap, FrameGrabber):
+                    cap.set_rate(None)
+                if resolution is not None:
+                    resolution.reset(timestamp)
+                result = pipeline.process(frame, timestamp)
+            else:
+                result = idle_result
+            draw_hands(frame, result.hands)
+            timer.lap("draw_hands")
+            
+            suggestions = completer.complete(pipeline.partial_word()) if completer is not None else []
+            if result.event.kind == GesturePipeline.COMMAND and result.event.token == ACCEPT_COMPLETION:
+                if suggestions:
+                    print(f"[ACTION] Completed {pipeline.partial_word()} -> {suggestions[0]}")
+                    pipeline.complete_word(suggestions[0])
+                    suggestions = completer.complete(pipeline.partial_word())
+            
+            confirmed = None
+            if result.event.kind == GestureRecognizer.CONFIRM:
+                confirmed = result.event.token
+                if result.first:
+                    print(f"[DETECTED] First letter: {confirmed}")
+                else:
+                    print(f"[DETECTED] {confirmed}")
+            
+            if recorder is not None:
+                recorder.write(raw_frame, timestamp, result.hands, confirmed)
+            
+            speech_status = speech.status
+            if stream is not None and speech_status[0] == SpeechWorker.IDLE:
+                speech_status = stream.status
+            frame = draw_ui_overlay(frame, result.pattern, result.token, 
+                                   pipeline.detected_sentence, result.first, result.event.progress,
+                                   speech_status, timer.hud_lines(), suggestions)
+            timer.lap("overlay")
+            
+            cv2.imshow(window_name, frame)
+            timer.lap("imshow")
+            
+            key = cv2.waitKey(1) & 0xFF
+            timer.lap("waitKey")
+            timer.end_frame(getattr(cap, "dropped", None))
+            if startup is not None:
+                startup.first_frame()
+                startup = None
+            if resolution is not None and (idle is None or idle.active):
+                fps = resolution.fps
+                # Time spent waiting for the camera is not load, so only processing time counts
+                level = resolution.tick(busy=time.perf_counter() - frame_start)
+                if level is not None:
+                    apply_resolution_level(cap, pipeline, level)
+                    print(f"[INFO] Processing at {fps or 0:.1f} fps, switching to "
+                          f"{level.width}x{level.height} capture, inference scale {level.inference_scale:.2f}")
+            if not handle_key(key, suggestions):
+                break
+    
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted by user")
+    except Exception as e:
+        print(f"[ERROR] Unexpected error in main loop: {e}")
+    finally:
+        speech.stop()
+        if stream is not None:
+            stream.stop()
+        if pipeline.events is not None:
+            pipeline.events.close()
+        timer.close()
+        cap.release()
+        cv2.destroyAllWindows()
+        if recorder is not None:
+            recorder.close()
+            print(f"[INFO] Recorded {recorder.frames} frames to {record_dir}")
+        scheduler = pipeline.scheduler
+        print(f"[INFO] Hand detection ran on {scheduler.detections} of {scheduler.frames} frames")
+        if isinstance(cap, FrameGrabber):
+            stats = cap.stats()
+            print(f"[INFO] Frames captured: {stats['captured']}, "
+                  f"dropped: {stats['dropped']}, consumed: {stats['consumed']}, skipped: {stats['skipped']}")
+        if idle is not None:
+            print(f"[INFO] Hand detection duty cycle: {idle.duty_cycle(time.monotonic()):.0%} "
+                  f"({idle.wakes} wakes)")
+    
+    try:
+        mixer = ensure_mixer()
+        mixer.music.load("havi_outro.mp3")
+        mixer.music.play()
+    except Exception as e:
+        print(f"[WARNING] Cannot play outro audio: {e}")
+
+    show_summary_screen()
+    
+    print("\n[GOODBYE] Thank you for using HAVI!")
+
+
+# ==========================
+# MULTI-PROCESS PIPELINE
+# ==========================
+
+def attach_shared_memory(name):
+    """Attach to shared memory created by another process without taking ownership of it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 there is no track flag; the stages share the render
+        # process's resource tracker, so attaching does not change who unlinks
+        return shared_memory.SharedMemory(name=name)
+
+class SharedFrameRing:
+    """Fixed-size frame slots in shared memory, addressed by sequence number modulo slot count"""
+    
+    def __init__(self, slots, shape, name=None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        size = slots * int(np.prod(self.shape))
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self._shm = attach_shared_memory(name)
+            self.owner = False
+        self.frames = np.ndarray((slots,) + self.shape, np.uint8, buffer=self._shm.buf)
+    
+    @property
+    def name(self):
+        return self._shm.name
+    
+    def close(self):
+        self.frames = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+def capture_stage(source, shapes, ring_names, jobs, busy, stop, workers):
+    """Capture process: mirror frames straight into free ring slots and queue (seq, slot, timestamp) jobs"""
+    ring = None
+    seq = 0
+    captured = dropped = 0
+    try:
+        cap = initialize_camera() if source is None else open_video_source(source)
+    except Exception as e:
+        print(f"[ERROR] Capture stage: {e}")
+        shapes.put(None)
+        return
+    try:
+        success, frame = cap.read()
+        shapes.put(frame.shape if success else None)
+        if not success:
+            return
+        try:
+            ring_name = ring_names.get(timeout=30)
+        except queue.Empty:
+            return
+        ring = SharedFrameRing(len(busy), frame.shape, ring_name)
+        
+        have_frame = True
+        while not stop.is_set():
+            if not have_frame:
+                success, frame = cap.read()
+                if not success:
+                    break
+            have_frame = False
+            captured += 1
+            slot = seq % ring.slots
+            if busy[slot]:
+                # Inference or render is behind; drop this frame instead of queueing it
+                dropped += 1
+                continue
+            busy[slot] = 1
+            cv2.flip(frame, 1, dst=ring.frames[slot])
+            jobs.put((seq, slot, time.monotonic()))
+            seq += 1
+    finally:
+        for _ in range(workers):
+            jobs.put(None)
+        cap.release()
+        if ring is not None:
+            ring.close()
+        print(f"[INFO] Capture stage: {captured} frames captured, {dropped} dropped, {seq} queued")
+
+def inference_stage(ring_name, shape, slots, jobs, results, inference_scale, working, index):
+    """Inference worker: detect hands on ring slots and send back packed hand records.
+
+    working[index] holds the seq being processed (-1 when idle), so the render
+    stage can free the slot if this process dies. The stop marker (None, index)
+    is sent on the way out, even after an exception.
+    """
+    detector = create_hand_detector()
+    ring = SharedFrameRing(slots, shape, ring_name)
+    record = np.zeros(1, HAND_RECORD_DTYPE)
+    context = FrameContext()
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            seq, slot, timestamp = job
+            working[index] = seq
+            hands = find_hands(detector, ring.frames[slot], inference_scale, draw=False, context=context)
+            add_fingers(detector, hands)
+            pack_hand_record(record[0], timestamp, hands)
+            results.put((seq, slot, record.tobytes()))
+            working[index] = -1
+    finally:
+        results.put((None, index))
+        ring.close()
+
+def run_multiprocess(workers=2, source=None, slots=None):
+    """Run capture, inference and render/UI as separate stages connected by a shared-memory frame ring.
+
+    The calling process is the render/UI stage, since HighGUI windows and key
+    handling have to stay on a main thread.
+    """
+    ctx = multiprocessing.get_context()
+    # Started before any stage so every process shares it and only the ring owner unlinks
+    resource_tracker.ensure_running()
+    slots = slots or workers * 2 + 2
+    shapes = ctx.Queue()
+    ring_names = ctx.Queue()
+    jobs = ctx.Queue()
+    results = ctx.Queue()
+    busy = ctx.Array("b", slots, lock=False)
+    working = ctx.Array("q", [-1] * workers, lock=False)
+    stop = ctx.Event()
+    
+    capture = ctx.Process(target=capture_stage,
+                          args=(source, shapes, ring_names, jobs, busy, stop, workers),
+                          name="havi-capture", daemon=True)
+    capture.start()
+    
+    shape = None
+    while shape is None:
+        try:
+            shape = shapes.get(timeout=0.5)
+            break
+        except queue.Empty:
+            if not capture.is_alive():
+                break
+    if shape is None:
+        print("[FATAL] Capture stage could not deliver a frame")
+        stop.set()
+        capture.join(timeout=2)
+        return
+    
+    ring = SharedFrameRing(slots, shape)
+    ring_names.put(ring.name)
+    inference = [ctx.Process(target=inference_stage,
+                             args=(ring.name, shape, slots, jobs, results, Config.INFERENCE_SCALE,
+                                   working, i),
+                             name=f"havi-inference-{i}", daemon=True)
+                 for i in range(workers)]
+    for process in inference:
+        process.start()
+    
+    window_name = "HAVI (Hand AI Voice Interface)"
+    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+    cv2.resizeWindow(window_name, shape[1], shape[0])
+    pipeline = GesturePipeline(None, commands=False)
+    pipeline.events = create_event_bus()
+    speech = SpeechWorker()
+    record = np.zeros(1, HAND_RECORD_DTYPE)
+    pending = {}
+    # Seqs skipped on screen whose slot is still owned by an inference worker
+    abandoned = set()
+    # Workers counted as finished, by stop marker or exit code, and workers that crashed
+    stopped = set()
+    lost = set()
+    next_seq = 0
+    finished = 0
+    shown = skipped = 0
+    waiting_since = None
+    capture_lost = False
+    
+    print(f"[READY] Pipeline running with {workers} inference workers and {slots} frame slots")
+    try:
+        while finished < workers:
+            try:
+                item = results.get(timeout=0.05)
+            except queue.Empty:
+                item = False
+            if item and item[0] is None:
+                if item[1] not in stopped:
+                    stopped.add(item[1])
+                    finished += 1
+            elif item:
+                seq, slot, data = item
+                if seq < next_seq:
+                    # Arrived after it was skipped; only now is the slot free for capture
+                    abandoned.discard(seq)
+                    busy[slot] = 0
+                else:
+                    pending[seq] = (slot, data)
+            
+            if next_seq in pending:
+                waiting_since = None
+            elif pending:
+                # A result that never arrives (crashed worker) must not stall the display
+                waiting_since = waiting_since or time.monotonic()
+                if time.monotonic() - waiting_since > 1.0:
+                    # The worker may only be slow, so the slot stays busy until its result arrives
+                    abandoned.add(next_seq)
+                    next_seq += 1
+                    skipped += 1
+                    waiting_since = None
+            
+            for i, process in enumerate(inference):
+                if i not in lost and process.exitcode:
+                    print(f"[ERROR] Inference worker {i} exited with code {process.exitcode}")
+                    lost.add(i)
+                    if i not in stopped:
+                        # A killed worker never sends its stop marker
+                        stopped.add(i)
+                        finished += 1
+                if i in lost and working[i] in abandoned:
+                    # It died holding this frame; the result will never arrive
+                    abandoned.discard(working[i])
+                    busy[working[i] % slots] = 0
+                    working[i] = -1
+            
+            while next_seq in pending:
+                slot, data = pending.pop(next_seq)
+                record[:] = np.frombuffer(data, HAND_RECORD_DTYPE)
+                hands = unpack_hand_record(record[0])
+                result = pipeline.process_hands(hands, float(record[0]["timestamp"]))
+                if result.event.kind == GestureRecognizer.CONFIRM:
+                    print(f"[DETECTED] {result.event.token}")
+                
+                if not stop.is_set():
+                    # Drawing happens in the slot itself; it is handed back right after imshow
+                    frame = ring.frames[slot]
+                    draw_hands(frame, hands)
+                    draw_ui_overlay(frame, result.pattern, result.token, pipeline.detected_sentence,
+                                    result.first, result.event.progress, speech.status)
+                    cv2.imshow(window_name, frame)
+                busy[slot] = 0
+                next_seq += 1
+                shown += 1
+            
+            if stop.is_set() and not any(process.is_alive() for process in inference):
+                break
+            
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q') and not stop.is_set():
+                print("\n[INFO] Exiting application...")
+                stop.set()
+            elif key == ord(' '):
+                pipeline.add_space()
+                print("[ACTION] Space added")
+            elif key == ord('c'):
+                pipeline.clear()
+                speech.interrupt()
+                print("[ACTION] Sentence cleared")
+            elif key == ord('s'):
+                pipeline.speak(speech)
+            
+            if not capture_lost and not capture.is_alive() and capture.exitcode:
+                # A crashed capture process never sends the workers their stop markers
+                capture_lost = True
+                for _ in range(workers):
+                    jobs.put(None)
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted by user")
+    finally:
+        stop.set()
+        speech.stop()
+        if pipeline.events is not None:
+            pipeline.events.close()
+        capture.join(timeout=2)
+        for process in inference:
+            process.join(timeout=2)
+        for process in [capture] + inference:
+            if process.is_alive():
+                process.terminate()
+        cv2.destroyAllWindows()
+        ring.close()
+        print(f"[INFO] Render stage: {shown} frames shown, {skipped} skipped")
+
+# ==========================
+# HEADLESS MODE
+# ==========================
+
+HEADLESS_COMMANDS = {
+    "space": "space", " ": "space",
+    "clear": "clear", "c": "clear",
+    "speak": "speak", "s": "speak",
+    "quit": "quit", "q": "quit",
+}
+
+def capture_clock(cap, source):
+    """Return the timestamp source for hold timers on a capture"""
+    if source is not None and not str(source).isdigit():
+        # Video files run faster than real time, so hold timers follow the file's clock
+        return lambda: cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+    return time.monotonic
+
+class CommandReader:
+    """Read control commands (space, clear, speak, quit) line by line from a stream on a background thread.
+
+    With targeted=True a line may start with a session name ("booth2 clear") and
+    commands are returned as (name, command) pairs, name None meaning all sessions.
+    """
+    
+    def __init__(self, stream, targeted=False):
+        self.targeted = targeted
+        self._commands = queue.Queue()
+        self._thread = threading.Thread(target=self._run, args=(stream,), name="havi-commands", daemon=True)
+        self._thread.start()
+    
+    def _run(self, stream):
+        for line in stream:
+            text = line.strip("\r\n")
+            target = None
+            if self.targeted and " " in text.strip():
+                target, text = text.strip().split(None, 1)
+            command = HEADLESS_COMMANDS.get(text.lower() or " ")
+            if command is None:
+                print(f"[WARNING] Unknown command: {line.strip()}")
+            else:
+                self._commands.put((target, command) if self.targeted else command)
+    
+    def push(self, command):
+        self._commands.put(command)
+    
+    def poll(self):
+        """Return the commands received since the last call"""
+        commands = []
+        while True:
+            try:
+                commands.append(self._commands.get_nowait())
+            except queue.Empty:
+                return commands
+
+def run_headless(source=None, commands=None, out=None):
+    """Run capture, detection and confirmation with no window or drawing.
+
+    Confirmed tokens are written to out (stdout by default), one per line, with
+    an empty line for a space. Log messages go to stderr.
+    """
+    out = out if out is not None else sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            cap = initialize_camera() if source is None else open_video_source(source)
+        except Exception as e:
+            print(f"[FATAL] Cannot proceed without camera: {e}")
+            return 1
+        if Config.CAPTURE_THREADED and source is None:
+            cap = FrameGrabber(cap).start()
+        clock = capture_clock(cap, source)
+        
+        if commands is None:
+            commands = CommandReader(sys.stdin)
+        timer = StageTimer(export_path=Config.PROFILE_EXPORT_PATH) if Config.PROFILE_ENABLED else NULL_TIMER
+        detector = create_hand_detector()
+        pipeline = GesturePipeline(detector, timer=timer, commands=False)
+        pipeline.events = create_event_bus()
+        speech = None
+        stream = None
+        if Config.SPEECH_STREAMING:
+            stream = StreamingSpeech()
+            pipeline.on_chunk = stream.push
+        
+        print("[READY] Headless recognition started")
+        try:
+            running = True
+            while running:
+                timer.begin_frame()
+                success, frame = pipeline.context.read(cap)
+                timer.lap("cap.read")
+                if not success:
+                    print("[INFO] No more frames")
+                    break
+                frame = pipeline.context.mirror(frame)
+                timer.lap("flip")
+                
+                result = pipeline.process(frame, clock())
+                if result.event.kind == GestureRecognizer.CONFIRM:
+                    out.write(result.event.token + "\n")
+                    out.flush()
+                timer.end_frame(getattr(cap, "dropped", None))
+                
+                for command in commands.poll():
+                    if command == "quit":
+                        running = False
+                    elif command == "space":
+                        pipeline.add_space()
+                        out.write("\n")
+                        out.flush()
+                    elif command == "clear":
+                        pipeline.clear()
+                        if speech is not None:
+                            speech.interrupt()
+                        if stream is not None:
+                            stream.interrupt()
+                        print("[ACTION] Sentence cleared")
+                    elif command == "speak":
+                        if stream is not None:
+                            stream.interrupt()
+                        if speech is None:
+                            speech = SpeechWorker()
+                        pipeline.speak(speech)
+        except KeyboardInterrupt:
+            print("[INFO] Interrupted by user")
+        finally:
+            if speech is not None:
+                speech.stop()
+            if stream is not None:
+                stream.stop()
+            if pipeline.events is not None:
+                pipeline.events.close()
+            timer.close()
+            cap.release()
+            scheduler = pipeline.scheduler
+            print(f"[INFO] Hand detection ran on {scheduler.detections} of {scheduler.frames} frames")
+    return 0
+
+# ==========================
+# MULTI-SESSION SERVING
+# ==========================
+
+def parse_session_spec(spec, index=0):
+    """Split a NAME=SOURCE session argument, naming bare sources booth1, booth2, ..."""
+    name, sep, source = spec.partition("=")
+    if not sep:
+        return f"booth{index + 1}", spec
+    return name, source
+
+class RecognitionSession:
+    """One camera or video source with its own detector and recognition state"""
+    
+    def __init__(self, name, source, fps=Config.SESSION_FPS, out=None, events=None):
+        self.name = name
+        self.source = source
+        self.fps = fps
+        self.out = out
+        self.events = events
+        self.is_file = not str(source).isdigit()
+        self.cap = None
+        self.pipeline = None
+        self.clock = time.monotonic
+        self.frames = 0
+        self.tokens = 0
+        self.failures = 0
+        self.started = None
+        self.busy_time = 0.0
+    
+    def open(self):
+        cap = open_video_source(self.source)
+        if Config.CAPTURE_THREADED and not self.is_file:
+            cap = FrameGrabber(cap).start()
+        self.cap = cap
+        self.clock = capture_clock(cap, self.source)
+        if self.pipeline is None:
+            detector = create_hand_detector()
+            self.pipeline = GesturePipeline(detector, commands=False)
+            self.pipeline.events = self.events
+            self.pipeline.name = self.name
+        else:
+            # Keep the sentence across a restart but not a half-held gesture
+            self.pipeline.recognizer.reset(first=False)
+        if self.started is None:
+            self.started = time.monotonic()
+        return self
+    
+    def step(self):
+        """Process one frame and return the confirmed token (or None), or False when the source ended"""
+        context = self.pipeline.context
+        success, frame = context.read(self.cap)
+        if not success:
+            return False
+        result = self.pipeline.process(context.mirror(frame), self.clock())
+        self.frames += 1
+        if result.event.kind == GestureRecognizer.CONFIRM:
+            self.tokens += 1
+            return result.event.token
+        return None
+    
+    def command(self, command):
+        if command == "space":
+            self.pipeline.add_space()
+            self.emit("")
+        elif command == "clear":
+            self.pipeline.clear()
+            print(f"[ACTION] {self.name}: sentence cleared")
+    
+    def emit(self, token):
+        if self.out is not None:
+            self.out.write(f"{self.name}\t{token}\n")
+            self.out.flush()
+    
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+    
+    def summary(self):
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        fps = self.frames / elapsed if elapsed > 0 else 0.0
+        load = self.busy_time / elapsed * 100 if elapsed > 0 else 0.0
+        return (f"{self.name}: {self.frames} frames ({fps:.1f} fps, target {self.fps:g}), "
+                f"{self.tokens} tokens, {self.failures} failures, {load:.0f}% of one worker")
+
+class SessionSupervisor:
+    """Run several RecognitionSessions on a shared thread pool.
+
+    Each session is stepped at most once at a time and no faster than its fps
+    target. When the pool is saturated the session that is furthest behind
+    schedule runs next, so every booth gets a fair share. A session that raises
+    or loses its camera is closed and reopened after a growing delay without
+    affecting the others.
+    """
+    
+    def __init__(self, sessions, workers=None, restart_delay=Config.SESSION_RESTART_DELAY,
+                 max_restart_delay=Config.SESSION_MAX_RESTART_DELAY):
+        self.sessions = {session.name: session for session in sessions}
+        self.workers = workers or min(len(self.sessions), os.cpu_count() or 1)
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self._due = {}
+        self._delay = {}
+        self._in_flight = {}
+        self._closed = set()
+        self._stop = threading.Event()
+        self.speech = None
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _step(self, session):
+        start = time.perf_counter()
+        try:
+            return session.step()
+        finally:
+            session.busy_time += time.perf_counter() - start
+    
+    def _start(self, session, now):
+        try:
+            session.open()
+        except Exception as e:
+            self._fail(session, now, e)
+            return
+        print(f"[SUCCESS] Session {session.name} opened {session.source}")
+        self._due[session.name] = now
+    
+    def _fail(self, session, now, error):
+        session.failures += 1
+        session.close()
+        delay = self._delay.get(session.name, self.restart_delay)
+        self._delay[session.name] = min(delay * 2, self.max_restart_delay)
+        print(f"[ERROR] Session {session.name} failed: {error}; restarting in {delay:.1f}s")
+        self._due[session.name] = ("restart", now + delay)
+    
+    def _finish(self, session):
+        session.close()
+        self._closed.add(session.name)
+        self._due.pop(session.name, None)
+        print(f"[INFO] Session {session.name} finished")
+    
+    def _collect(self, name, future, now):
+        session = self.sessions[name]
+        if name in self._closed:
+            return
+        try:
+            token = future.result()
+        except Exception as e:
+            self._fail(session, now, e)
+            return
+        if token is False:
+            if session.is_file:
+                self._finish(session)
+            else:
+                self._fail(session, now, "camera stopped delivering frames")
+            return
+        if token is not None:
+            session.emit(token)
+        # A healthy frame resets the backoff for the next failure
+        self._delay.pop(name, None)
+        interval = 1.0 / session.fps if session.fps > 0 else 0.0
+        # Catch up by at most one frame instead of bursting after a stall
+        self._due[name] = max(self._due[name] + interval, now - interval)
+    
+    def handle(self, target, command):
+        """Apply a command to one session, or to every session when target is None"""
+        if command == "quit" and target is None:
+            self.stop()
+            return
+        targets = self.sessions.values() if target is None else [self.sessions.get(target)]
+        for session in targets:
+            if session is None:
+                print(f"[WARNING] Unknown session: {target}")
+                continue
+            if session.name in self._closed or session.pipeline is None:
+                continue
+            if session.name in self._in_flight:
+                # Never touch a pipeline while a worker is stepping it
+                self._in_flight[session.name].exception()
+            if command == "quit":
+                self._finish(session)
+            elif command == "speak":
+                if self.speech is None:
+                    self.speech = SpeechWorker()
+                session.pipeline.speak(self.speech)
+            else:
+                session.command(command)
+    
+    def run(self, commands=None):
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        
+        now = time.monotonic()
+        for session in self.sessions.values():
+            self._start(session, now)
+        print(f"[READY] Serving {len(self.sessions)} sessions on {self.workers} workers")
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="havi-session") as pool:
+            try:
+                while not self._stop.is_set() and len(self._closed) < len(self.sessions):
+                    now = time.monotonic()
+                    for name, due in list(self._due.items()):
+                        if isinstance(due, tuple) and due[1] <= now:
+                            self._start(self.sessions[name], now)
+                    
+                    ready = sorted((due, name) for name, due in self._due.items()
+                                   if not isinstance(due, tuple) and due <= now
+                                   and name not in self._in_flight)
+                    for _, name in ready[:self.workers - len(self._in_flight)]:
+                        self._in_flight[name] = pool.submit(self._step, self.sessions[name])
+                    
+                    if len(self._in_flight) >= self.workers:
+                        # Pool is full; sessions that are already due can only start when a step finishes
+                        timeout = 0.1
+                    else:
+                        upcoming = [due[1] if isinstance(due, tuple) else due
+                                    for name, due in self._due.items() if name not in self._in_flight]
+                        upcoming = [due for due in upcoming if due > now]
+                        timeout = min(upcoming) - now if upcoming else 0.1
+                    if self._in_flight:
+                        done, _ = wait(self._in_flight.values(), timeout=min(timeout, 0.1),
+                                       return_when=FIRST_COMPLETED)
+                    else:
+                        done = ()
+                        time.sleep(min(timeout, 0.1))
+                    now = time.monotonic()
+                    for name, future in list(self._in_flight.items()):
+                        if future in done:
+                            del self._in_flight[name]
+                            self._collect(name, future, now)
+                    
+                    for target, command in commands.poll() if commands is not None else ():
+                        self.handle(target, command)
+            except KeyboardInterrupt:
+                print("[INFO] Interrupted by user")
+            finally:
+                for future in self._in_flight.values():
+                    future.cancel()
+                wait(self._in_flight.values())
+                for session in self.sessions.values():
+                    session.close()
+                if self.speech is not None:
+                    self.speech.stop()
+        for session in self.sessions.values():
+            print(f"[INFO] Session {session.summary()}")
+
+def run_serve(specs, fps=Config.SESSION_FPS, workers=None, commands=None, out=None):
+    """Serve one recognition session per source; tokens are written as NAME<TAB>TOKEN lines"""
+    out = out if out is not None else sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        events = create_event_bus()
+        sessions = []
+        for i, spec in enumerate(specs):
+            name, source = parse_session_spec(spec, i)
+            if any(session.name == name for session in sessions):
+                print(f"[ERROR] Duplicate session name: {name}")
+                return 1
+            sessions.append(RecognitionSession(name, source, fps, out, events))
+        if commands is None:
+            commands = CommandReader(sys.stdin, targeted=True)
+        try:
+            SessionSupervisor(sessions, workers).run(commands)
+        finally:
+            if events is not None:
+                events.close()
+    return 0
+
+# ==========================
+# BENCHMARKS
+# ==========================
+
+def open_video_source(source):
+    """Open a camera index or video file"""
+    cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video source {source}")
+    return cap
+
+def load_frames(source, max_frames):
+    """Read up to max_frames mirrored frames from a video source"""
+    cap = open_video_source(source)
+    frames = []
+    try:
+        while len(frames) < max_frames:
+            success, frame = cap.read()
+            if not success:
+                break
+            frames.append(cv2.flip(frame, 1))
+    finally:
+        cap.release()
+    if not frames:
+        raise ValueError(f"No frames read from {source}")
+    return frames
+
+def benchmark_inference_scale(source, scales=(1.0, 0.75, 0.5, 0.35), max_frames=300):
+    """Report detection fps and token agreement with full resolution at each inference scale"""
+    frames = load_frames(source, max_frames)
+    h, w = frames[0].shape[:2]
+    print(f"[BENCH] {len(frames)} frames at {w}x{h} from {source}")
+    
+    results = {}
+    for scale in sorted(set([1.0] + list(scales)), reverse=True):
+        # A fresh detector per run so MediaPipe tracking state does not carry over
+        detector = create_hand_detector()
+        tokens = []
+        start = time.perf_counter()
+        for frame in frames:
+            hands = find_hands(detector, frame, scale, draw=False)
+            tokens.append(get_letter_from_pattern(get_hands_data(detector, hands)))
+        results[scale] = (time.perf_counter() - start, tokens)
+    
+    reference_time, reference = results[1.0]
+    print(f"{'scale':>6} {'input':>11} {'ms/frame':>9} {'fps':>7} {'speedup':>8} {'agreement':>10}")
+    for scale, (elapsed, tokens) in results.items():
+        agreement = sum(a == b for a, b in zip(tokens, reference)) / len(reference)
+        size = f"{int(w * scale)}x{int(h * scale)}"
+        print(f"{scale:>6.2f} {size:>11} {elapsed / len(frames) * 1000:>9.2f} "
+              f"{len(frames) / elapsed:>7.1f} {reference_time / elapsed:>7.2f}x {agreement:>9.1%}")
+    return results
+
+def token_edit_distance(predicted, expected):
+    """Levenshtein distance between two token sequences"""
+    previous = list(range(len(expected) + 1))
+    for i, token in enumerate(predicted, 1):
+        current = [i]
+        for j, target in enumerate(expected, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (token != target)))
+        previous = current
+    return previous[-1]
+
+def latency_summary(latencies):
+    """Return (p50, p95, p99) of latencies in milliseconds"""
+    if not latencies:
+        return 0.0, 0.0, 0.0
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return float(p50), float(p95), float(p99)
+
+def benchmark_session(directory, live_detector=False, render=False, video=True, display=False):
+    """Run the recognition pipeline over a recorded session and report its metrics.
+
+    render adds landmark and overlay drawing, display also shows every frame
+    in a window as the windowed application does.
+    """
+    session = ReplaySession(directory)
+    cap = session.capture(video=video or live_detector)
+    if live_detector:
+        detector = create_hand_detector()
+    else:
+        detector = session.detector()
+    pipeline = GesturePipeline(detector)
+    
+    latencies = []
+    confirmed = []
+    start = time.perf_counter()
+    try:
+        while True:
+            frame_start = time.perf_counter()
+            success, frame = pipeline.context.read(cap)
+            if not success:
+                break
+            frame = pipeline.context.mirror(frame)
+            result = pipeline.process(frame, cap.timestamp())
+            if result.event.kind == GestureRecognizer.CONFIRM:
+                confirmed.append(result.event.token)
+            if render:
+                draw_hands(frame, result.hands)
+                draw_ui_overlay(frame, result.pattern, result.token, pipeline.detected_sentence,
+                                result.first, result.event.progress)
+            if display:
+                cv2.imshow("HAVI benchmark", frame)
+                cv2.waitKey(1)
+            latencies.append(time.perf_counter() - frame_start)
+    finally:
+        cap.release()
+        if display:
+            cv2.destroyWindow("HAVI benchmark")
+    elapsed = time.perf_counter() - start
+    
+    p50, p95, p99 = latency_summary(latencies)
+    report = {
+        "session": directory,
+        "frames": len(latencies),
+        "fps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "tokens": len(confirmed),
+        "tokens_per_minute": len(confirmed) / (session.duration / 60) if session.duration > 0 else 0.0,
+        "accuracy": None,
+    }
+    expected = session.transcript()
+    if expected:
+        errors = token_edit_distance(confirmed, expected)
+        report["accuracy"] = max(0.0, 1.0 - errors / len(expected))
+    return report
+
+def benchmark_headless(directory, live_detector=False, display=False):
+    """Compare pipeline throughput with and without window rendering on a recorded session.
+
+    Both runs decode the recorded video, as live capture would, so only drawing differs.
+    """
+    windowed = benchmark_session(directory, live_detector, render=True, video=True, display=display)
+    headless = benchmark_session(directory, live_detector, render=False, video=True)
+    print("[BENCH] windowed mode")
+    print_benchmark_report(windowed)
+    print("[BENCH] headless mode")
+    print_benchmark_report(headless)
+    if windowed["fps"] > 0:
+        print(f"[BENCH] headless throughput: {headless['fps'] / windowed['fps']:.2f}x windowed")
+    return windowed, headless
+
+def replay_sessions(directories, live_detector=False):
+    """Yield (frame, timestamp, detector, has_hands) over sessions played back to back on one timeline"""
+    detector = create_hand_detector() if live_detector else None
+    offset = 0.0
+    for directory in directories:
+        session = ReplaySession(directory)
+        if not os.path.exists(session.video_path):
+            raise ValueError(f"{directory} has no frames.mp4; idle detection needs recorded video")
+        cap = session.capture()
+        session_detector = detector or session.detector()
+        start = session.timestamp(0) if len(session) else 0.0
+        try:
+            while True:
+                success, frame = cap.read()
+                if not success:
+                    break
+                index = session.position
+                yield frame, offset + session.timestamp(index) - start, session_detector, \
+                    bool(session.records["count"][index])
+        finally:
+            cap.release()
+        offset += session.duration + 1.0 / session.fps
+
+def benchmark_idle(directories, live_detector=False, timeout=Config.IDLE_TIMEOUT):
+    """Compare CPU time with and without the idle gate over recorded idle and active sessions.
+
+    Sessions are played back to back, e.g. an empty room followed by signing.
+    CPU time covers what the live loop does per frame (flip, detection or the
+    motion check, overlay) but not video decoding, which the live loop skips
+    while idle by grabbing frames without decoding them.
+    """
+    reports = {}
+    for gated in (False, True):
+        pipeline = None
+        gate = IdleGate(timeout=timeout) if gated else None
+        idle_result = FrameResult([], NO_PATTERN, None, RecognizerEvent(GestureRecognizer.IDLE, None, 0.0), True)
+        confirmed = []
+        processed = frames = 0
+        cpu = 0.0
+        hands_since = None
+        wake_latencies = []
+        now = 0.0
+        for frame, now, detector, has_hands in replay_sessions(directories, live_detector):
+            frames += 1
+            if pipeline is None:
+                pipeline = GesturePipeline(detector)
+            pipeline.detector = detector
+            if gate is not None and not gate.active:
+                if has_hands and hands_since is None:
+                    hands_since = now
+                if not gate.due(now):
+                    continue
+            
+            start = time.process_time()
+            frame = pipeline.context.mirror(frame)
+            if gate is None or gate.active:
+                result = pipeline.process(frame, now)
+                if gate is not None:
+                    gate.update(now, result.hands)
+            elif gate.watch(now, frame):
+                if hands_since is not None:
+                    wake_latencies.append(now - hands_since)
+                hands_since = None
+                result = pipeline.process(frame, now)
+            else:
+                result = idle_result
+            draw_hands(frame, result.hands)
+            draw_ui_overlay(frame, result.pattern, result.token, pipeline.detected_sentence,
+                            result.first, result.event.progress)
+            cpu += time.process_time() - start
+            processed += 1
+            if result.event.kind == GestureRecognizer.CONFIRM:
+                confirmed.append(result.event.token)
+        
+        reports["gated" if gated else "always_on"] = {
+            "frames": frames,
+            "processed": processed,
+            "cpu_seconds": cpu,
+            "tokens": confirmed,
+            "duty_cycle": gate.duty_cycle(now) if gate is not None else 1.0,
+            "wakes": gate.wakes if gate is not None else 0,
+            "wake_latencies": wake_latencies,
+            "missed_wake": hands_since is not None,
+        }
+    
+    always_on, gated = reports["always_on"], reports["gated"]
+    for name, report in (("always on", always_on), ("idle gated", gated)):
+        print(f"[BENCH] {name}: {report['processed']} of {report['frames']} frames processed, "
+              f"CPU {report['cpu_seconds'] * 1000:.0f} ms, duty cycle {report['duty_cycle']:.0%}, "
+              f"{report['wakes']} wakes, tokens {''.join(report['tokens']) or '-'}")
+    if gated["wake_latencies"]:
+        latencies = gated["wake_latencies"]
+        print(f"[BENCH] wake-up latency: mean {sum(latencies) / len(latencies) * 1000:.0f} ms, "
+              f"max {max(latencies) * 1000:.0f} ms")
+    if gated["missed_wake"]:
+        print("[WARNING] Hands appeared while idle without waking the gate")
+    if always_on["cpu_seconds"] > 0:
+        saving = 1.0 - gated["cpu_seconds"] / always_on["cpu_seconds"]
+        print(f"[BENCH] CPU saving: {saving:.0%}")
+    if gated["tokens"] != always_on["tokens"]:
+        print("[WARNING] The idle gate changed the recognized tokens")
+    return reports
+
+def check_allocations(directory, threshold=Config.ALLOC_CHECK_THRESHOLD, render=True):
+    """Replay a session through the frame loop under tracemalloc and report large per-frame allocations.
+
+    The session is played twice with the same pipeline: the first pass fills
+    buffers and caches, the second is measured. For each measured frame the
+    peak of traced memory above the frame's starting point is taken, which
+    catches temporary arrays as well as retained ones. Returns True when no
+    frame allocated threshold bytes or more.
+    """
+    import tracemalloc
+    
+    session = ReplaySession(directory)
+    pipeline = GesturePipeline(session.detector())
+    context = pipeline.context
+    
+    def run(measure):
+        cap = session.capture()
+        peaks = []
+        try:
+            while True:
+                if measure:
+                    tracemalloc.reset_peak()
+                    start = tracemalloc.get_traced_memory()[0]
+                success, frame = context.read(cap)
+                if not success:
+                    break
+                frame = context.mirror(frame)
+                result = pipeline.process(frame, cap.timestamp())
+                if render:
+                    draw_hands(frame, result.hands)
+                    draw_ui_overlay(frame, result.pattern, result.token, pipeline.detected_sentence,
+                                    result.first, result.event.progress)
+                if measure:
+                    peaks.append(tracemalloc.get_traced_memory()[1] - start)
+                # Drop this frame's references first, or a per-frame copy would free its
+                # predecessor inside the next frame's measurement and cancel out
+                frame = result = None
+        finally:
+            cap.release()
+        return peaks
+    
+    run(False)
+    warm_allocations = context.allocations
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        peaks = run(True)
+        retained = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    
+    if not peaks:
+        print(f"[ERROR] {directory} has no frames")
+        return False
+    large = sum(1 for peak in peaks if peak >= threshold)
+    ordered = sorted(peaks)
+    frame_bytes = session.width * session.height * 3
+    print(f"[ALLOC] {directory}: {len(peaks)} frames of {session.width}x{session.height} "
+          f"({frame_bytes / 1024:.0f} KiB each)")
+    print(f"[ALLOC] per-frame peak p50/p95/max {ordered[len(ordered) // 2] / 1024:.1f}/"
+          f"{ordered[int(len(ordered) * 0.95)] / 1024:.1f}/{ordered[-1] / 1024:.1f} KiB, "
+          f"retained over the pass {retained / 1024:.1f} KiB, "
+          f"buffers reallocated {context.allocations - warm_allocations}")
+    if large:
+        print(f"[WARNING] {large} frames allocated {threshold / 1024:.0f} KiB or more")
+        return False
+    print(f"[SUCCESS] No frame allocated {threshold / 1024:.0f} KiB or more")
+    return True
+
+def print_benchmark_report(report):
+    accuracy = "n/a" if report["accuracy"] is None else f"{report['accuracy']:.1%}"
+    print(f"[BENCH] {report['session']}: {report['frames']} frames, {report['fps']:.1f} fps, "
+          f"latency p50/p95/p99 {report['p50_ms']:.2f}/{report['p95_ms']:.2f}/{report['p99_ms']:.2f} ms, "
+          f"{report['tokens']} tokens ({report['tokens_per_minute']:.1f}/min), accuracy {accuracy}")
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="HAVI (Hand AI Voice Interface)")
+    parser.add_argument("--inference-scale", type=float, default=Config.INFERENCE_SCALE,
+                        help="scale factor for the frame passed to hand detection")
+    parser.add_argument("--record", metavar="DIR",
+                        help="record camera frames and hand results to a session directory")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="run capture, N inference worker processes and render as a staged pipeline")
+    parser.add_argument("--landmark-index", metavar="PATH", default=Config.LANDMARK_INDEX_PATH,
+                        help="landmark template index made with build-index (used if the file exists)")
+    parser.add_argument("--events", metavar="SINK", action="append", default=[],
+                        help="publish recognition events to jsonl:PATH, unix:PATH or tcp:HOST:PORT (repeatable)")
+    parser.add_argument("--event-policy", choices=EVENT_POLICIES, default=Config.EVENT_POLICY,
+                        help="what to do when a sink's queue is full")
+    parser.add_argument("--stream-speech", action="store_true",
+                        help="speak each word as soon as it is confirmed or a space ends it")
+    parser.add_argument("--startup-log", metavar="FILE",
+                        help="append the time to first frame and startup step timings to a .jsonl file")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each stage of the frame loop and show a performance card")
+    parser.add_argument("--profile-export", metavar="FILE",
+                        help="periodically append stage timings to a .csv or .jsonl file")
+    commands = parser.add_subparsers(dest="command")
+    
+    bench_scale = commands.add_parser("bench-scale",
+                                      help="compare detection fps and agreement across inference scales")
+    bench_scale.add_argument("source", help="video file or camera index")
+    bench_scale.add_argument("--scales", default="1.0,0.75,0.5,0.35",
+                             help="comma separated inference scales")
+    bench_scale.add_argument("--frames", type=int, default=300, help="maximum frames to use")
+    
+    bench = commands.add_parser("bench", help="run the pipeline headless over recorded sessions")
+    bench.add_argument("sessions", nargs="+", help="session directories made with --record")
+    bench.add_argument("--live-detector", action="store_true",
+                       help="run MediaPipe on the recorded video instead of replaying hand results")
+    bench.add_argument("--render", action="store_true", help="include landmark and overlay drawing")
+    bench.add_argument("--no-video", action="store_true",
+                       help="skip video decoding when replaying hand results")
+    
+    headless = commands.add_parser("headless",
+                                   help="recognize without a window and write confirmed tokens to stdout")
+    headless.add_argument("--source", help="video file or camera index (default: configured camera)")
+    headless.add_argument("--commands", metavar="PATH",
+                          help="read commands from a file or named pipe instead of stdin")
+    
+    bench_headless = commands.add_parser("bench-headless",
+                                         help="compare windowed and headless throughput on a recorded session")
+    bench_headless.add_argument("session", help="session directory made with --record")
+    bench_headless.add_argument("--live-detector", action="store_true",
+                                help="run MediaPipe on the recorded video instead of replaying hand results")
+    bench_headless.add_argument("--display", action="store_true",
+                                help="include imshow/waitKey in the windowed run")
+    
+    bench_idle = commands.add_parser("bench-idle",
+                                     help="measure the idle gate's CPU saving and wake-up latency on recorded sessions")
+    bench_idle.add_argument("sessions", nargs="+",
+                            help="session directories made with --record, played back to back (e.g. idle then active)")
+    bench_idle.add_argument("--live-detector", action="store_true",
+                            help="run MediaPipe on the recorded video instead of replaying hand results")
+    bench_idle.add_argument("--timeout", type=float, default=Config.IDLE_TIMEOUT,
+                            help="seconds without hands before going idle")
+    
+    alloc_check = commands.add_parser("alloc-check",
+                                      help="check that the frame loop makes no large allocations on a recorded session")
+    alloc_check.add_argument("session", help="session directory made with --record")
+    alloc_check.add_argument("--threshold", type=int, default=Config.ALLOC_CHECK_THRESHOLD // 1024,
+                             help="largest allowed per-frame allocation in KiB")
+    alloc_check.add_argument("--no-render", action="store_true", help="leave out landmark and overlay drawing")
+    
+    serve = commands.add_parser("serve",
+                                help="run one headless recognition session per camera or video source")
+    serve.add_argument("sources", nargs="+", metavar="[NAME=]SOURCE",
+                       help="camera index or video file, optionally named (booth1=0)")
+    serve.add_argument("--fps", type=float, default=Config.SESSION_FPS,
+                       help="target frames per second for each session")
+    serve.add_argument("--threads", type=int, default=None,
+                       help="worker threads shared by all sessions (default: one per session, up to the CPU count)")
+    
+    build_index = commands.add_parser("build-index",
+                                      help="build a landmark template index from recorded samples")
+    build_index.add_argument("out", help="output .npz file")
+    build_index.add_argument("samples", nargs="+", metavar="LABEL=DIR",
+                             help="token and a session directory made with --record showing it")
+    build_index.add_argument("--stride", type=int, default=1, help="use every Nth frame")
+    
+    check_vocabulary = commands.add_parser("check-vocabulary",
+                                           help="validate a gesture vocabulary file")
+    check_vocabulary.add_argument("path", help="JSON file mapping finger patterns to tokens")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    Config.INFERENCE_SCALE = args.inference_scale
+    Config.LANDMARK_INDEX_PATH = args.landmark_index
+    Config.STARTUP_LOG_PATH = args.startup_log
+    Config.SPEECH_STREAMING = Config.SPEECH_STREAMING or args.stream_speech
+    Config.EVENT_SINKS = tuple(args.events) or Config.EVENT_SINKS
+    Config.EVENT_POLICY = args.event_policy
+    Config.PROFILE_ENABLED = args.profile or bool(args.profile_export)
+    Config.PROFILE_EXPORT_PATH = args.profile_export
+    if args.command == "bench-scale":
+        benchmark_inference_scale(args.source, [float(s) for s in args.scales.split(",")], args.frames)
+    elif args.command == "bench":
+        for session in args.sessions:
+            print_benchmark_report(benchmark_session(session, args.live_detector, args.render,
+                                                     not args.no_video))
+    elif args.command == "headless":
+        command_stream = open(args.commands, "r", encoding="utf-8") if args.commands else sys.stdin
+        sys.exit(run_headless(args.source, CommandReader(command_stream)))
+    elif args.command == "serve":
+        sys.exit(run_serve(args.sources, args.fps, args.threads))
+    elif args.command == "bench-headless":
+        benchmark_headless(args.session, args.live_detector, args.display)
+    elif args.command == "bench-idle":
+        try:
+            benchmark_idle(args.sessions, args.live_detector, args.timeout)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+    elif args.command == "alloc-check":
+        try:
+            clean = check_allocations(args.session, args.threshold * 1024, not args.no_render)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+        sys.exit(0 if clean else 1)
+    elif args.command == "build-index":
+        try:
+            build_landmark_index(args.samples, args.out, args.stride)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+    elif args.command == "check-vocabulary":
+        try:
+            vocabulary = GestureVocabulary.from_file(args.path)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+        for warning in vocabulary.warnings:
+            print(f"[WARNING] {warning}")
+        print(f"[SUCCESS] {len(vocabulary.patterns)} patterns, {len(vocabulary.tokens)} tokens")
+    elif args.workers > 0:
+        run_multiprocess(args.workers)
+    else:
+        main(args.record)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import HAVI
+
+
+def make_session(directory, frames=60, width=640, height=360):
+    """Record a synthetic session: a hand-sized blob moving across a static scene, holding one pattern"""
+    recorder = HAVI.SessionRecorder(str(directory), fps=30)
+    background = np.full((height, width, 3), 90, np.uint8)
+    cv2.rectangle(background, (40, 40), (200, 160), (40, 120, 200), -1)
+    landmarks = [[10 * (i % 5), 12 * (i // 5), 0] for i in range(21)]
+    for i in range(frames):
+        x, y = 200 + 2 * i, 120
+        frame = background.copy()
+        cv2.rectangle(frame, (x, y), (x + 80, y + 100), (150, 170, 210), -1)
+        hand = {
+            "type": "Right",
+            "fingers": [0, 1, 0, 0, 0],
+            "center": (x + 40, y + 50),
+            "bbox": (x, y, 80, 100),
+            "lmList": [[x + lx, y + ly, z] for lx, ly, z in landmarks],
+        }
+        recorder.write(frame, i / 30.0, [hand])
+    recorder.close()
+    return str(directory)
+
+
+def test_frame_loop_makes_no_large_allocations(tmp_path):
+    assert HAVI.check_allocations(make_session(tmp_path / "session"))
+
+
+def test_unbuffered_flip_is_reported(tmp_path, monkeypatch):
+    directory = make_session(tmp_path / "session")
+    monkeypatch.setattr(HAVI.FrameContext, "mirror", lambda self, frame: cv2.flip(frame, 1))
+    assert not HAVI.check_allocations(directory)
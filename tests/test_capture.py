@@ -0,0 +1,122 @@
+import os
+import sys
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import HAVI
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCapture:
+    """Capture backend whose delivered fps depends on the mode, advancing a fake clock on each read.
+
+    substitutes maps a requested (width, height, fourcc) to the mode the device
+    really switches to, as drivers do for sizes they do not support.
+    """
+
+    def __init__(self, speeds, clock, substitutes=None):
+        self.speeds = speeds
+        self.clock = clock
+        self.substitutes = substitutes or {}
+        self.mode = (640, 480, "YUYV")
+        self.reads = {}
+
+    def set(self, prop, value):
+        width, height, fourcc = self.mode
+        if prop == cv2.CAP_PROP_FOURCC:
+            fourcc = HAVI.fourcc_name(value)
+        elif prop == cv2.CAP_PROP_FRAME_WIDTH:
+            width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            height = int(value)
+        self.mode = self.substitutes.get((width, height, fourcc), (width, height, fourcc))
+        return True
+
+    def get(self, prop):
+        width, height, fourcc = self.mode
+        return {cv2.CAP_PROP_FRAME_WIDTH: width, cv2.CAP_PROP_FRAME_HEIGHT: height,
+                cv2.CAP_PROP_FOURCC: cv2.VideoWriter_fourcc(*fourcc), cv2.CAP_PROP_FPS: 30}.get(prop, 0)
+
+    def read(self, image=None):
+        self.reads[self.mode] = self.reads.get(self.mode, 0) + 1
+        self.clock.now += 1.0 / self.speeds.get(self.mode, 5)
+        return True, None
+
+
+def negotiate(speeds, substitutes=None):
+    clock = FakeClock()
+    cap = FakeCapture(speeds, clock, substitutes)
+    best, results = HAVI.negotiate_capture_mode(cap, 30, modes=((1920, 1080), (1280, 720), (960, 540), (640, 480)),
+                                                fourccs=("MJPG", "YUYV"), clock=clock)
+    return cap, best, results
+
+
+def test_mjpg_chosen_over_slow_yuyv():
+    cap, best, _ = negotiate({(1920, 1080, "YUYV"): 5, (1280, 720, "YUYV"): 10,
+                              (1920, 1080, "MJPG"): 15, (1280, 720, "MJPG"): 30})
+    assert (best.width, best.height, best.fourcc) == (1280, 720, "MJPG")
+    assert cap.mode == (1280, 720, "MJPG")
+
+
+def test_largest_mode_reaching_90_percent_of_target():
+    _, best, _ = negotiate({(1920, 1080, "MJPG"): 26, (1280, 720, "MJPG"): 28,
+                            (960, 540, "MJPG"): 30, (640, 480, "YUYV"): 30})
+    assert (best.width, best.height, best.fourcc) == (1280, 720, "MJPG")
+    assert best.fps >= 27
+
+
+def test_substituted_mode_measured_once():
+    frames = HAVI.Config.CAPTURE_MEASURE_FRAMES + 3
+    cap, _, results = negotiate({(640, 480, "MJPG"): 12, (640, 480, "YUYV"): 8},
+                                substitutes={(960, 540, "YUYV"): (640, 480, "YUYV")})
+    keys = [mode[:3] for mode in results]
+    assert len(keys) == len(set(keys))
+    assert cap.reads[(640, 480, "YUYV")] == frames
+    # Nothing reaches the target, so the fastest mode wins
+    assert cap.mode == (640, 480, "MJPG")
+
+
+def run_controller(controller, busy, seconds, start=0.0, fps=30):
+    """Tick once per camera frame with a processing time that depends on the level; return (time, level) changes"""
+    changes = []
+    t = start
+    while t < start + seconds:
+        t += 1.0 / fps
+        if controller.tick(t, busy=busy(controller.level)) is not None:
+            changes.append((t, controller.level))
+    return changes
+
+
+def make_controller():
+    levels = HAVI.resolution_levels(1920, 1080, 0.5, min_capture=(960, 540))
+    return HAVI.ResolutionController(levels, 30, band=(0.75, 0.92), settle=2.0, clock=lambda: 0.0)
+
+
+def test_controller_steps_down_under_load_and_up_with_headroom():
+    controller = make_controller()
+    # Level 0 sustains 15 fps and level 1 20 fps; level 2 settles inside the band
+    changes = run_controller(controller, lambda level: {0: 1 / 15, 1: 1 / 20}.get(level, 1 / 25), 20)
+    assert [level for _, level in changes] == [1, 2]
+    assert controller.level == 2
+
+    changes = run_controller(controller, lambda level: 1 / 60, 30, start=20.0)
+    assert [level for _, level in changes] == [1, 0]
+
+
+def test_controller_step_up_backoff_doubles():
+    controller = make_controller()
+    # Only level 0 is too slow, so every step up is undone and further step ups are held off
+    changes = run_controller(controller, lambda level: 1 / 15 if level == 0 else 1 / 60, 150)
+    assert [level for _, level in changes][:6] == [1, 0, 1, 0, 1, 0]
+    raises = [t for t, level in changes if level == 0]
+    gaps = [later - earlier for earlier, later in zip(raises, raises[1:])]
+    assert all(later > earlier * 1.5 for earlier, later in zip(gaps, gaps[1:]))
@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import HAVI
+
+FPS = 30
+FRAME = 1.0 / FPS
+
+
+def make_recognizer():
+    return HAVI.GestureRecognizer(first_hold=2.5, hold=1.5, window=16, window_seconds=0.5, confidence=0.7)
+
+
+def feed(recognizer, timeline, start=0.0):
+    """Feed (seconds, token) spans at FPS and return the (timestamp, token) confirmations"""
+    confirmed = []
+    t = start
+    for duration, token in timeline:
+        for _ in range(int(round(duration * FPS))):
+            event = recognizer.update(t, token)
+            if event.kind == HAVI.GestureRecognizer.CONFIRM:
+                confirmed.append((t, event.token))
+            t += FRAME
+    return confirmed
+
+
+def test_flickered_frame_does_not_restart_first_hold():
+    recognizer = make_recognizer()
+    confirmed = feed(recognizer, [(1.0, "A"), (FRAME, None), (1.0, "A"), (FRAME, "B"), (1.0, "A")])
+    assert [token for _, token in confirmed] == ["A"]
+    assert confirmed[0][0] == pytest.approx(2.5, abs=2 * FRAME)
+
+
+def test_hand_change_mid_window_does_not_confirm_old_token():
+    recognizer = make_recognizer()
+    confirmed = feed(recognizer, [(2.4, "A"), (3.0, "B")])
+    assert [token for _, token in confirmed] == ["B"]
+    # B gets its own full first hold from when it appeared
+    assert confirmed[0][0] == pytest.approx(2.4 + 2.5, abs=2 * FRAME)
+
+
+def test_first_and_later_holds_use_their_own_durations():
+    recognizer = make_recognizer()
+    confirmed = feed(recognizer, [(6.0, "A")])
+    times = [t for t, _ in confirmed]
+    assert [token for _, token in confirmed] == ["A", "A", "A"]
+    assert times[0] == pytest.approx(2.5, abs=2 * FRAME)
+    assert times[1] - times[0] == pytest.approx(1.5, abs=2 * FRAME)
+    assert times[2] - times[1] == pytest.approx(1.5, abs=2 * FRAME)
+
+
+def test_reset_requires_first_hold_again():
+    recognizer = make_recognizer()
+    confirmed = feed(recognizer, [(2.6, "A")])
+    assert len(confirmed) == 1 and not recognizer.first
+
+    recognizer.reset()
+    assert recognizer.first
+    confirmed = feed(recognizer, [(3.0, "B")], start=10.0)
+    assert [token for _, token in confirmed] == ["B"]
+    assert confirmed[0][0] - 10.0 == pytest.approx(2.5, abs=2 * FRAME)